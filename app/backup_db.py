@@ -0,0 +1,41 @@
+"""
+Snapshot / restore the gallery database without stopping the app
+
+    python backup_db.py snapshot [path] [--compress] [--tenant NAME]
+    python backup_db.py restore <path> [--tenant NAME]
+"""
+import argparse
+
+from db import backup, tenants
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot or restore gallery.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    snap = commands.add_parser("snapshot", help="copy the live database to a file")
+    snap.add_argument("path", nargs="?", help="output file (default: backups/gallery-<time>.db)")
+    snap.add_argument("--compress", action="store_true", help="gzip the snapshot")
+
+    rest = commands.add_parser("restore", help="overwrite the live database from a snapshot")
+    rest.add_argument("path", help="snapshot file (.db or .db.gz)")
+
+    for command in (snap, rest):
+        command.add_argument("--tenant", default=tenants.DEFAULT_TENANT,
+                             help="tenant gallery to work on (default: gallery.db)")
+
+    args = parser.parse_args()
+    if not tenants.exists(args.tenant):
+        parser.error(f"unknown tenant: {args.tenant}")
+
+    with tenants.use(args.tenant):
+        if args.command == "snapshot":
+            result = backup.snapshot(args.path, compress=args.compress)
+            print(f"✓ Snapshot written to {result['path']} ({result['size']:,} bytes in {result['seconds']}s)")
+        else:
+            result = backup.restore(args.path)
+            print(f"✓ Restored {result['path']} ({result['size']:,} bytes in {result['seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Benchmark suite for the Safebox Video Gallery
+
+Run from the app/ directory:
+
+    python -m benchmarks.seed --videos 100k
+    python -m benchmarks.run --scenario home --target asgi
+    python -m benchmarks.compare results/before.json results/after.json
+"""
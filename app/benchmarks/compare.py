@@ -0,0 +1,48 @@
+"""
+Compare two benchmark result files
+
+    python -m benchmarks.compare baseline.json candidate.json
+"""
+import argparse
+import json
+
+
+def load(path: str) -> tuple:
+    """(results by scenario name, the whole report)"""
+    with open(path) as f:
+        report = json.load(f)
+    return {r["scenario"]: r for r in report["results"]}, report
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "    n/a"
+    return f"{(after - before) / before * 100:+7.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    base, base_report = load(args.baseline)
+    cand, cand_report = load(args.candidate)
+    print(f"baseline {base_report['commit']} ({base_report['target']})  →  "
+          f"candidate {cand_report['commit']} ({cand_report['target']})\n")
+    print(f"{'scenario':<22} {'req/s':>20} {'p50 ms':>26} {'p99 ms':>26}")
+
+    for name in base:
+        if name not in cand:
+            continue
+        b, c = base[name], cand[name]
+        print(
+            f"{name:<22} "
+            f"{b['throughput_rps']:>7.1f} → {c['throughput_rps']:>7.1f} {change(b['throughput_rps'], c['throughput_rps'])}  "
+            f"{b['latency_ms']['p50']:>7.2f} → {c['latency_ms']['p50']:>7.2f} {change(b['latency_ms']['p50'], c['latency_ms']['p50'])}  "
+            f"{b['latency_ms']['p99']:>7.2f} → {c['latency_ms']['p99']:>7.2f} {change(b['latency_ms']['p99'], c['latency_ms']['p99'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
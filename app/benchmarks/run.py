@@ -0,0 +1,199 @@
+"""
+Benchmark runner
+
+Drives the app either in-process through the ASGI interface or over HTTP
+against a local uvicorn, and writes latency percentiles and throughput
+to JSON so runs can be compared across commits.
+
+    python -m benchmarks.run --scenario home --scenario video_detail \
+        --target asgi --requests 2000 --concurrency 20
+    python -m benchmarks.run --scenario all --target uvicorn --workers 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+import httpx
+
+from benchmarks.scenarios import SCENARIOS, cleanup, prepare
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+PERCENTILES = (50, 90, 95, 99)
+APP_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_scenario(client, name: str, ctx: dict, requests: int, concurrency: int, seed: int) -> dict:
+    """Fire `requests` calls of one scenario with `concurrency` workers."""
+    scenario = SCENARIOS[name]
+    latencies = []
+    statuses = Counter()
+    errors = Counter()
+    remaining = requests
+
+    async def worker(worker_id: int):
+        nonlocal remaining
+        rng = random.Random(seed + worker_id)
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, ctx, rng)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            **{f"p{p}": round(percentile(latencies, p), 3) for p in PERCENTILES},
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+        "errors": dict(errors),
+    }
+
+
+async def run_all(client, names: list, args) -> list:
+    ctx = await prepare(client, names)
+    if "video_detail" in names and not ctx["video_ids"]:
+        raise SystemExit("❌ No videos in the catalog - run `python -m benchmarks.seed` first")
+
+    results = []
+    try:
+        for name in names:
+            if args.warmup:
+                await run_scenario(client, name, ctx, args.warmup, args.concurrency, args.seed)
+            result = await run_scenario(client, name, ctx, args.requests, args.concurrency, args.seed)
+            result["catalog_size"] = ctx["total_videos"]
+            p = result["latency_ms"]
+            print(f"  {name:<22} {result['throughput_rps']:>9.1f} req/s   "
+                  f"p50 {p['p50']:>8.2f} ms   p99 {p['p99']:>8.2f} ms   {result['status_codes']}")
+            results.append(result)
+    finally:
+        await cleanup(ctx)
+    return results
+
+
+async def run_asgi(names: list, args) -> list:
+    """Drive the app in-process, without any network or server overhead."""
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            return await run_all(client, names, args)
+
+
+async def wait_until_healthy(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"❌ Server at {base_url} did not become healthy")
+
+
+async def run_uvicorn(names: list, args) -> list:
+    """Start a local uvicorn and drive it over real HTTP connections."""
+    base_url = f"http://127.0.0.1:{args.port}"
+    # One signing key for all workers, or logins only work on the worker that issued them
+    env = dict(os.environ, SECRET_KEY=os.environ.get("SECRET_KEY") or secrets.token_urlsafe(32))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app",
+         "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=APP_DIR,
+        env=env,
+    )
+    try:
+        await wait_until_healthy(base_url)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            return await run_all(client, names, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run gallery benchmarks")
+    parser.add_argument("--scenario", action="append", choices=[*SCENARIOS, "all"],
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=50, help="untimed requests per scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (uvicorn target only)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    names = list(SCENARIOS) if not args.scenario or "all" in args.scenario else args.scenario
+    commit = git_commit()
+
+    print(f"Running {', '.join(names)} against {args.target} @ {commit}")
+    runner = run_asgi if args.target == "asgi" else run_uvicorn
+    results = asyncio.run(runner(names, args))
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "target": args.target,
+        "workers": args.workers if args.target == "uvicorn" else None,
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit}-{args.target}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
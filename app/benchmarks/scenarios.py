@@ -0,0 +1,116 @@
+"""
+Benchmark scenarios
+
+Each scenario is an async callable (client, ctx, rng) -> httpx.Response.
+`ctx` is filled once by prepare() with a sample of video ids, the catalog
+size and, for admin scenarios, a session cookie. Files stored by the
+upload scenario are listed in ctx["uploaded"]; cleanup() deletes them.
+"""
+import random
+import sqlite3
+
+from config import get_settings
+from db import database
+
+settings = get_settings()
+
+ID_SAMPLE_SIZE = 1000
+PAGE_SIZE = 6
+
+# 1x1 transparent PNG
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6300010000050001a5f645400000000049454e44ae426082"
+)
+
+
+def load_catalog_sample(path: str, sample_size: int = ID_SAMPLE_SIZE) -> dict:
+    """Read the catalog size and a random sample of video ids without a full scan."""
+    conn = sqlite3.connect(path)
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        max_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM videos").fetchone()[0]
+        rowids = random.Random(0).sample(range(1, max_rowid + 1), min(sample_size, max_rowid))
+        placeholders = ",".join("?" * len(rowids))
+        ids = [
+            row[0] for row in
+            conn.execute(f"SELECT id FROM videos WHERE rowid IN ({placeholders})", rowids)
+        ] if rowids else []
+    finally:
+        conn.close()
+    return {"total_videos": total, "video_ids": ids}
+
+
+async def login(client) -> str:
+    """Log in as the default admin and return the session cookie header value."""
+    response = await client.post("/api/auth/login", json={
+        "email": settings.DEFAULT_ADMIN_EMAIL,
+        "password": settings.DEFAULT_ADMIN_PASSWORD,
+    })
+    response.raise_for_status()
+    return f"admin_session={response.cookies['admin_session']}"
+
+
+async def home(client, ctx, rng):
+    return await client.get("/")
+
+
+async def videos_partial_deep(client, ctx, rng):
+    # Offsets from the back half of the catalog, where OFFSET paging hurts most
+    total = ctx["total_videos"]
+    skip = rng.randint(total // 2, max(total - PAGE_SIZE, total // 2))
+    return await client.get("/videos/partial", params={"skip": skip, "limit": PAGE_SIZE})
+
+
+async def video_detail(client, ctx, rng):
+    return await client.get(f"/video/{rng.choice(ctx['video_ids'])}")
+
+
+async def login_burst(client, ctx, rng):
+    return await client.post("/api/auth/login", json={
+        "email": settings.DEFAULT_ADMIN_EMAIL,
+        "password": settings.DEFAULT_ADMIN_PASSWORD,
+    })
+
+
+async def upload(client, ctx, rng):
+    response = await client.post(
+        "/api/admin/upload",
+        files={"file": ("bench.png", PNG_BYTES, "image/png")},
+        headers={"Cookie": ctx["cookie"]},
+    )
+    if response.status_code == 200:
+        ctx["uploaded"].append(response.json()["url"].rsplit("/", 1)[-1])
+    return response
+
+
+SCENARIOS = {
+    "home": home,
+    "videos_partial_deep": videos_partial_deep,
+    "video_detail": video_detail,
+    "login_burst": login_burst,
+    "upload": upload,
+}
+
+# Scenarios that need an admin session cookie in ctx
+ADMIN_SCENARIOS = {"upload"}
+
+
+async def prepare(client, names) -> dict:
+    """Build the shared context needed by the selected scenarios."""
+    ctx = load_catalog_sample(database.DATABASE_PATH)
+    ctx["uploaded"] = []
+    if ADMIN_SCENARIOS.intersection(names):
+        ctx["cookie"] = await login(client)
+    return ctx
+
+
+async def cleanup(ctx: dict):
+    """Delete the files the upload scenario stored."""
+    from storage import get_storage
+
+    storage = get_storage()
+    for filename in ctx["uploaded"]:
+        await storage.delete(filename)
+    if ctx["uploaded"]:
+        print(f"🧹 Deleted {len(ctx['uploaded'])} benchmark upload(s)")
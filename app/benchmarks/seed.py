@@ -0,0 +1,149 @@
+"""
+Synthetic catalog generator
+
+Resets the database (see reset_db.py) and bulk-loads N fake videos whose
+next_video_id links form learning paths of 3-12 videos, the way admins
+actually build them. A database that already has videos is only reset
+with --force.
+
+    python -m benchmarks.seed --videos 1k|100k|1m|<count> [--seed 42] [--force]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from db import database
+from reset_db import reset_database
+
+PRESETS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+BATCH_SIZE = 10_000
+PATH_LENGTH = (3, 12)
+
+YOUTUBE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+TOPICS = [
+    "Document Vault", "Estate Planning", "Client Onboarding", "Secure Sharing",
+    "Beneficiary Setup", "Digital Legacy", "Two-Factor Login", "Family Access",
+    "Insurance Records", "Tax Documents", "Will Storage", "Emergency Contacts",
+]
+ACTIONS = [
+    "Getting Started with", "Deep Dive:", "Best Practices for", "Troubleshooting",
+    "Advanced", "A Quick Tour of", "Explaining", "Five Tips on",
+]
+SENTENCES = [
+    "This walkthrough covers the steps advisors use most often with clients.",
+    "We explain where each setting lives and why it matters for security.",
+    "Follow along to configure the feature for a new household.",
+    "Common questions from clients are answered at the end.",
+    "Make sure your client has verified their email before starting.",
+    "Shared documents stay encrypted at rest and in transit.",
+    "You can revisit this video at any time from the gallery.",
+]
+
+INSERT_SQL = """
+    INSERT INTO videos (id, title, description, video_link, youtube_id,
+                        next_video_id, order_index, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def parse_count(value: str) -> int:
+    """Accept a preset name (1k, 100k, 1m) or a plain integer."""
+    return PRESETS.get(value.lower()) or int(value)
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_videos(count: int, seed: int = 42):
+    """Yield video rows in order_index order, chained into learning paths."""
+    rng = random.Random(seed)
+    start = datetime.now() - timedelta(days=730)
+    step = timedelta(days=730) / max(count, 1)
+
+    next_id = _uuid(rng)
+    path_left = rng.randint(*PATH_LENGTH)
+    for idx in range(count):
+        video_id = next_id
+        next_id = _uuid(rng)
+
+        path_left -= 1
+        if path_left == 0 or idx == count - 1:
+            next_video_id = None
+            path_left = rng.randint(*PATH_LENGTH)
+        else:
+            next_video_id = next_id
+
+        youtube_id = "".join(rng.choice(YOUTUBE_ALPHABET) for _ in range(11))
+        title = f"{rng.choice(ACTIONS)} {rng.choice(TOPICS)} #{idx + 1}"
+        description = " ".join(rng.choices(SENTENCES, k=rng.randint(2, 6)))
+        created_at = (start + step * idx).strftime("%Y-%m-%d %H:%M:%S")
+
+        yield (
+            video_id, title, description,
+            f"https://www.youtube.com/watch?v={youtube_id}", youtube_id,
+            next_video_id, idx, created_at, created_at,
+        )
+
+
+def bulk_insert(path: str, count: int, seed: int = 42):
+    """Insert the synthetic catalog in large batches on a plain sqlite3 connection."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA synchronous = OFF")
+        batch = []
+        for row in generate_videos(count, seed):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                conn.executemany(INSERT_SQL, batch)
+                conn.commit()
+                batch.clear()
+        if batch:
+            conn.executemany(INSERT_SQL, batch)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def existing_videos(path: str) -> int:
+    """Videos in the database at `path`; 0 if there is none yet."""
+    if not os.path.exists(path):
+        return 0
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0  # no videos table yet
+    finally:
+        conn.close()
+
+
+async def seed_catalog(count: int, seed: int = 42):
+    """Reset the database and fill it with `count` synthetic videos."""
+    await reset_database()
+
+    print(f"Seeding {count:,} synthetic videos...")
+    started = time.perf_counter()
+    bulk_insert(database.DATABASE_PATH, count, seed)
+    print(f"✓ Seeded {count:,} videos in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic video catalog")
+    parser.add_argument("--videos", default="1k", help="1k, 100k, 1m or an exact count")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for reproducible catalogs")
+    parser.add_argument("--force", action="store_true", help="reset the database even if it has videos")
+    args = parser.parse_args()
+    existing = existing_videos(database.DATABASE_PATH)
+    if existing and not args.force:
+        parser.error(f"{database.DATABASE_PATH} has {existing:,} videos; pass --force to replace them")
+    asyncio.run(seed_catalog(parse_count(args.videos), args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,9 +11,84 @@ class Settings(BaseSettings):
     APP_NAME: str = "Safebox Advisor Gallery"
     DEBUG: bool = True
     
+    # Server (see serve.py)
+    HOST: str = "0.0.0.0"
+    PORT: int = 80
+    WORKERS: int = 0  # 0 = one per CPU core
+    GRACEFUL_TIMEOUT: int = 30  # seconds a worker gets to finish requests on restart
+    MAX_REQUESTS: int = 10000  # recycle workers after this many requests (0 = never)
+    
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./gallery.db"
     
+    # Query profiler
+    SLOW_QUERY_MS: float = 50.0
+    N_PLUS_ONE_THRESHOLD: int = 5
+    QUERY_PROFILE_HISTORY: int = 50
+    
+    # Caches
+    CACHE_COHERENCE_INTERVAL: float = 1.0  # seconds between catalog/admins version polls
+    API_CACHE_MAX_AGE: int = 60  # Cache-Control max-age for the JSON catalog API
+    
+    # Background jobs
+    JOB_WORKERS: int = 2  # asyncio workers per process
+    JOB_POLL_INTERVAL: float = 1.0  # seconds between polls when idle
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_BACKOFF_BASE: float = 2.0  # seconds; doubles on every retry
+    JOB_BACKOFF_MAX: float = 300.0
+    JOB_LEASE_SECONDS: int = 300  # a 'running' job older than this is re-queued
+    JOB_RETENTION_DAYS: int = 7  # done/failed jobs older than this are deleted
+    
+    # Offline service worker (static/js/sw.js) and its catalog manifest
+    SW_PRECACHE_PAGES: int = 10  # "load more" fragments of /videos precached
+    SW_PRECACHE_VIDEOS: int = 50  # video pages precached, in display order
+    
+    # Admission control (limits are per worker process)
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_QUEUE_BUDGET_MS: float = 250.0  # longest a request may wait for a slot before 503
+    ADMISSION_RETRY_AFTER: int = 2  # seconds, sent with 503 responses
+    LOGIN_CONCURRENCY: int = 4  # bcrypt is CPU-bound
+    LOGIN_RATE_PER_MINUTE: float = 10.0  # per client address
+    METADATA_CONCURRENCY: int = 8  # outbound fetches in /utils/metadata
+    METADATA_RATE_PER_MINUTE: float = 60.0
+    UPLOAD_CONCURRENCY: int = 4
+    UPLOAD_QUEUE_BUDGET_MS: float = 2000.0
+    DEFAULT_CONCURRENCY: int = 256  # everything else (public pages, API)
+    
+    # Admin notifications (Server-Sent Events)
+    SSE_MAX_CONNECTIONS: int = 100  # open event streams per worker
+    SSE_QUEUE_SIZE: int = 100  # events buffered per subscriber before it is dropped
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_RETRY_MS: int = 3000  # client reconnect delay
+    NOTIFICATION_POLL_INTERVAL: float = 1.0  # seconds; picks up events from other workers
+    NOTIFICATION_RETENTION_DAYS: int = 30
+    
+    # Database maintenance (see db/maintenance.py)
+    MAINTENANCE_INTERVAL: float = 60.0  # seconds between passes
+    MAINTENANCE_IDLE_RPS: float = 1.0  # heavier steps only run at or below this request rate (all workers together)
+    MAINTENANCE_WAL_TRUNCATE_MB: int = 64  # truncate the WAL once it is larger than this
+    MAINTENANCE_ANALYZE_HOURS: float = 24.0
+    MAINTENANCE_VACUUM_MIN_FREE_PAGES: int = 256
+    MAINTENANCE_VACUUM_PAGES: int = 1024  # pages released per incremental_vacuum step
+    
+    # Multi-tenant galleries (see db/tenants.py); "" serves gallery.db only
+    TENANT_MODE: str = ""  # "host" (acme.example.com) or "path" (/t/acme/...)
+    TENANT_DIR: str = "tenants"  # one <tenant>.db per gallery
+    TENANT_DOMAIN: str = ""  # host mode: <tenant>.TENANT_DOMAIN
+    TENANT_HOSTS: dict = {}  # host mode: explicit host -> tenant mapping, checked first
+    TENANT_IDLE_SECONDS: float = 600.0  # close a tenant's database after this long without requests
+    TENANT_MAX_OPEN: int = 200  # least recently used tenants are closed beyond this
+    TENANT_POOL_SIZE: int = 4  # idle connections kept per open tenant
+    TENANT_ACTIVE_SECONDS: float = 60.0  # after this long without requests a tenant gets no background polling
+    TENANT_IDLE_POLL_SECONDS: float = 60.0  # job polls of tenants that aren't active
+
+    # Backups
+    BACKUP_DIR: str = "backups"
+    BACKUP_STEP_PAGES: int = 256  # pages copied per backup step
+    BACKUP_STEP_SLEEP: float = 0.005  # seconds between steps, lets other connections in
+    BACKUP_MAX_RESTARTS: int = 3  # stepwise copies restarted by writes before copying in one step
+    BACKUP_MAX_SECONDS: float = 300.0  # the same, for a stepwise copy that takes too long
+    
     # JWT Settings
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ALGORITHM: str = "HS256"
@@ -30,6 +105,26 @@ class Settings(BaseSettings):
     ALLOWED_IMAGE_TYPES: list = ["image/jpeg", "image/png", "image/gif", "image/webp", "image/svg+xml"]
     ALLOWED_VIDEO_TYPES: list = ["video/mp4", "video/webm", "video/ogg"]
     
+    # Resumable (chunked) uploads
+    RESUMABLE_UPLOAD_DIR: str = "upload_sessions"  # partial files while uploading
+    RESUMABLE_MAX_FILE_SIZE: int = 4 * 1024 * 1024 * 1024  # 4GB
+    RESUMABLE_UPLOAD_EXPIRY_HOURS: int = 24  # sessions idle longer than this are removed
+    
+    # Upload storage backend: "local" (UPLOAD_DIR) or "s3"
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = "uploads/"
+    S3_ENDPOINT_URL: str = ""  # e.g. http://localhost:9000 for MinIO
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_PUBLIC_URL: str = ""  # redirect here instead of presigning (public bucket / CDN)
+    S3_PRESIGN_EXPIRES: int = 3600
+    S3_MULTIPART_THRESHOLD_MB: int = 8
+    S3_MULTIPART_CHUNK_MB: int = 8
+    S3_MAX_CONCURRENCY: int = 8  # parallel part uploads per file
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    
     # CORS
     CORS_ORIGINS: list = ["*"]
     
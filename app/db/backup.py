@@ -0,0 +1,202 @@
+"""
+Database snapshot / restore using SQLite's online backup API
+
+Snapshots copy pages in small steps with a short sleep in between, so
+readers and writers on the live database are never blocked for the whole
+copy. SQLite starts a stepwise copy over whenever another connection
+writes, so on a busy database it could run forever: after
+BACKUP_MAX_RESTARTS restarts or BACKUP_MAX_SECONDS the snapshot is taken
+in a single step instead (in WAL mode that still lets writers through).
+A restore writes the live database in a single step as well: until it
+commits, requests keep seeing the old contents, never a mix of both.
+
+Everything works on the current tenant's database; snapshots of tenants
+other than the default one go to BACKUP_DIR/tenants/<tenant>/.
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from config import get_settings
+from db import database, tenants
+
+settings = get_settings()
+
+COMPRESS_LEVEL = 6
+GZIP_SUFFIX = ".gz"
+
+
+class _GiveUp(Exception):
+    """Raised from the progress callback to abandon a stepwise copy."""
+
+
+class _Pacer:
+    """Progress callback of a stepwise copy: sleeps between steps, gives up on restarts or time."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.restarts = 0
+        self.remaining = None
+
+    def __call__(self, status, remaining, total):
+        if self.remaining is not None and remaining > self.remaining:
+            # A write from another connection sent the copy back to the start
+            self.restarts += 1
+        self.remaining = remaining
+        if not remaining:
+            return
+        if (self.restarts > settings.BACKUP_MAX_RESTARTS
+                or time.monotonic() - self.started > settings.BACKUP_MAX_SECONDS):
+            raise _GiveUp(f"{self.restarts} restart(s) in {time.monotonic() - self.started:.1f}s")
+        # The source lock is released here, so sleeping gives other
+        # connections a window to read and write.
+        time.sleep(settings.BACKUP_STEP_SLEEP)
+
+
+def _copy(source: sqlite3.Connection, target: sqlite3.Connection, pages: int = None):
+    """
+    Copy `pages` pages per step (default BACKUP_STEP_PAGES; -1 copies
+    everything at once). A stepwise copy that keeps being restarted falls
+    back to a single step.
+    """
+    if pages == -1:
+        source.backup(target, pages=-1)
+        return
+    try:
+        source.backup(
+            target,
+            pages=pages or settings.BACKUP_STEP_PAGES,
+            progress=_Pacer(),
+            sleep=settings.BACKUP_STEP_SLEEP,
+        )
+    except _GiveUp as e:
+        print(f"⚠️  Stepwise backup gave up ({e}); copying in one step")
+        source.backup(target, pages=-1)
+
+
+def _gzip(src_path: str, dest_path: str):
+    with open(src_path, "rb") as src, gzip.open(dest_path, "wb", compresslevel=COMPRESS_LEVEL) as dest:
+        shutil.copyfileobj(src, dest, 1024 * 1024)
+
+
+def _gunzip(src_path: str, dest_path: str):
+    with gzip.open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+        shutil.copyfileobj(src, dest, 1024 * 1024)
+
+
+def backup_dir() -> str:
+    """Where the current tenant's snapshots are kept."""
+    tenant = tenants.current()
+    if tenant == tenants.DEFAULT_TENANT:
+        return settings.BACKUP_DIR
+    return os.path.join(settings.BACKUP_DIR, "tenants", tenant)
+
+
+def default_snapshot_path(compress: bool) -> str:
+    stem = "gallery" if tenants.current() == tenants.DEFAULT_TENANT else tenants.current()
+    name = f"{stem}-{datetime.now():%Y%m%d-%H%M%S}.db"
+    return os.path.join(backup_dir(), name + (GZIP_SUFFIX if compress else ""))
+
+
+def snapshot(dest_path: str = None, compress: bool = False) -> dict:
+    """
+    Take a consistent copy of the live database.
+    The copy is written to a temporary file first and renamed into place,
+    so a half-written snapshot never appears under its final name.
+    """
+    if dest_path is None:
+        dest_path = default_snapshot_path(compress)
+    elif compress and not dest_path.endswith(GZIP_SUFFIX):
+        dest_path += GZIP_SUFFIX
+
+    dest_dir = os.path.dirname(os.path.abspath(dest_path))
+    os.makedirs(dest_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    fd, tmp_db = tempfile.mkstemp(suffix=".db", dir=dest_dir)
+    os.close(fd)
+    tmp_out = tmp_db + GZIP_SUFFIX
+    try:
+        source = sqlite3.connect(database.database_path())
+        target = sqlite3.connect(tmp_db)
+        try:
+            _copy(source, target)
+        finally:
+            target.close()
+            source.close()
+
+        if compress:
+            _gzip(tmp_db, tmp_out)
+            os.replace(tmp_out, dest_path)
+        else:
+            os.replace(tmp_db, dest_path)
+    finally:
+        for path in (tmp_db, tmp_out):
+            if os.path.exists(path):
+                os.remove(path)
+
+    return {
+        "path": dest_path,
+        "size": os.path.getsize(dest_path),
+        "compressed": compress,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def restore(src_path: str) -> dict:
+    """
+    Replace the contents of the live database with a snapshot.
+    Accepts plain or gzip-compressed (.gz) snapshots. A compressed snapshot
+    is unpacked to a temporary file first; the live database is then
+    overwritten in one step, so it is never seen half restored.
+    """
+    if not os.path.exists(src_path):
+        raise FileNotFoundError(src_path)
+
+    started = time.perf_counter()
+    tmp_db = None
+    if src_path.endswith(GZIP_SUFFIX):
+        fd, tmp_db = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        _gunzip(src_path, tmp_db)
+
+    try:
+        source = sqlite3.connect(tmp_db or src_path)
+        target = sqlite3.connect(database.database_path())
+        try:
+            _copy(source, target, pages=-1)
+        finally:
+            target.close()
+            source.close()
+    finally:
+        if tmp_db and os.path.exists(tmp_db):
+            os.remove(tmp_db)
+
+    return {
+        "path": src_path,
+        "size": os.path.getsize(database.database_path()),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def list_snapshots() -> list:
+    """Snapshots of the current tenant, newest first."""
+    directory = backup_dir()
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for name in os.listdir(directory):
+        if not (name.endswith(".db") or name.endswith(".db" + GZIP_SUFFIX)):
+            continue
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        entries.append({
+            "name": name,
+            "size": stat.st_size,
+            "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+        })
+    return sorted(entries, key=lambda e: e["created_at"], reverse=True)
@@ -3,16 +3,42 @@ Safebox Blog Database Setup
 """
 import aiosqlite
 import os
+import sqlite3
 from config import get_settings
+from db import tenants
+from db.profiler import ProfiledConnection
 
 settings = get_settings()
 
 DATABASE_PATH = "gallery.db"
 
 
+def database_path(tenant: str = None) -> str:
+    """Database file of `tenant` (default: the current tenant)."""
+    tenant = tenant or tenants.current()
+    return DATABASE_PATH if tenant == tenants.DEFAULT_TENANT else tenants.tenant_file(tenant)
+
+
+def connect(database: str = None) -> aiosqlite.Connection:
+    """
+    Open a connection to the current tenant's database (or `database`).
+    Drop-in replacement for aiosqlite.connect() that records every query
+    in the request's query profile. Tenant connections come from, and go
+    back to, the tenant's pool.
+    """
+    path = database or database_path()
+
+    def connector() -> sqlite3.Connection:
+        return sqlite3.connect(path)
+
+    if database is not None:
+        return ProfiledConnection(connector, 64)
+    return tenants.pool().acquire(connector)
+
+
 async def get_db():
-    """Get database connection."""
-    db = await aiosqlite.connect(DATABASE_PATH)
+    """Get database connection (FastAPI dependency, used by routers/auth.py); profiled like connect()."""
+    db = await connect()
     db.row_factory = aiosqlite.Row
     try:
         yield db
@@ -22,7 +48,13 @@ async def get_db():
 
 async def init_db():
     """Initialize database tables."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
+        # Only takes effect on a brand-new file, so it must come first; older
+        # files switch with `python -m db.maintenance --vacuum`
+        await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # Readers don't block the writer (and vice versa); persists in the file
+        await db.execute("PRAGMA journal_mode = WAL")
+
         # Create admins table
         await db.execute("""
             CREATE TABLE IF NOT EXISTS admins (
@@ -53,18 +85,62 @@ async def init_db():
             )
         """)
         
-        # Create notifications table (keeping for potential system alerts, though maybe unused)
+        # Create notifications table (admin events, see utils/notifications.py)
         await db.execute("""
             CREATE TABLE IF NOT EXISTS notifications (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 type TEXT NOT NULL,
                 message TEXT NOT NULL,
                 link TEXT,
+                data TEXT,
                 is_read BOOLEAN DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
 
+        # Create jobs table (background job queue, see jobs/queue.py)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL DEFAULT 'queued',
+                priority INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 5,
+                dedup_key TEXT,
+                run_after REAL NOT NULL,
+                locked_until REAL,
+                result TEXT,
+                last_error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority DESC, run_after)
+        """)
+        # Only one queued job per dedup key
+        await db.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (dedup_key)
+            WHERE dedup_key IS NOT NULL AND status = 'queued'
+        """)
+
+        # Create upload_sessions table (resumable uploads in progress)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                content_type TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                checksum TEXT,
+                admin_id INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+
         await db.commit()
         
         # Run migrations for existing databases
@@ -107,27 +183,76 @@ async def run_migrations(db):
             await db.execute("UPDATE videos SET order_index = ? WHERE id = ?", (idx, video_id))
         await db.commit()
         print(f"  ✓ Initialized order_index for {len(videos)} videos")
+    
+    # Migration: Add data column to notifications (JSON event payload)
+    cursor = await db.execute("PRAGMA table_info(notifications)")
+    if 'data' not in [col[1] for col in await cursor.fetchall()]:
+        print("  → Adding 'data' column to notifications table...")
+        await db.execute("ALTER TABLE notifications ADD COLUMN data TEXT")
+        await db.commit()
+        print("  ✓ Migration complete: data added")
+    
+    # Index for display-order lookups (listing pages, keyset pagination)
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_videos_order ON videos (order_index, id)")
+    # Admin dashboard sorting/filtering and the next-video typeahead
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_videos_title ON videos (title COLLATE NOCASE, id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_videos_created ON videos (created_at, id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_videos_next ON videos (next_video_id)")
+
+    # Catalog version for offline clients (/api/v1/manifest), bumped by every change to videos
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    await db.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        await db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS videos_catalog_version_{event.lower()} AFTER {event} ON videos
+            BEGIN
+                UPDATE catalog_version SET version = version + 1;
+            END
+        """)
+
+    # Same for admins, so workers drop cached admin rows (utils/cache.py)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS admins_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    await db.execute("INSERT OR IGNORE INTO admins_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        await db.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS admins_version_{event.lower()} AFTER {event} ON admins
+            BEGIN
+                UPDATE admins_version SET version = version + 1;
+            END
+        """)
+    await db.commit()
 
 
-async def create_default_admin():
+async def create_default_admin(email: str = None, password: str = None):
     """Create default admin user if not exists."""
     from utils.security import get_password_hash
-    
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+
+    email = email or settings.DEFAULT_ADMIN_EMAIL
+    async with connect() as db:
         # Check if admin exists
         cursor = await db.execute(
             "SELECT id FROM admins WHERE email = ?",
-            (settings.DEFAULT_ADMIN_EMAIL,)
+            (email,)
         )
         existing = await cursor.fetchone()
         
         if not existing:
-            password_hash = get_password_hash(settings.DEFAULT_ADMIN_PASSWORD)
+            password_hash = get_password_hash(password or settings.DEFAULT_ADMIN_PASSWORD)
             await db.execute(
                 "INSERT INTO admins (email, password_hash, name) VALUES (?, ?, ?)",
-                (settings.DEFAULT_ADMIN_EMAIL, password_hash, settings.DEFAULT_ADMIN_NAME)
+                (email, password_hash, settings.DEFAULT_ADMIN_NAME)
             )
             await db.commit()
-            print(f"✓ Default admin created: {settings.DEFAULT_ADMIN_EMAIL}")
+            print(f"✓ Default admin created: {email}")
         else:
-            print(f"✓ Admin already exists: {settings.DEFAULT_ADMIN_EMAIL}")
+            print(f"✓ Admin already exists: {email}")
@@ -0,0 +1,281 @@
+"""
+Scheduled SQLite maintenance - WAL checkpoints, planner statistics, incremental vacuum
+
+run_maintenance() is started from the app lifespan. Every
+MAINTENANCE_INTERVAL seconds it runs a passive WAL checkpoint, which never
+waits on readers or writers. The heavier steps only run while the whole
+server is quiet: at most MAINTENANCE_IDLE_RPS requests per second, summed
+over every worker, and none in flight. Each worker writes its own request
+rate to a file in gallery.db.traffic/ on every tick, so whichever worker
+holds the maintenance lock sees the load of all of them (each figure is
+up to one MAINTENANCE_INTERVAL old):
+
+- wal_checkpoint(TRUNCATE) once the WAL outgrows MAINTENANCE_WAL_TRUNCATE_MB
+- ANALYZE (bounded by analysis_limit) + PRAGMA optimize every
+  MAINTENANCE_ANALYZE_HOURS
+- incremental_vacuum in MAINTENANCE_VACUUM_PAGES steps while free pages
+  exceed MAINTENANCE_VACUUM_MIN_FREE_PAGES
+
+Every tenant this worker has open is maintained in turn. With several
+workers only the one holding a database's maintenance lock file runs it.
+A tenant without recent requests is skipped while its database and WAL
+files are unchanged since its last pass.
+
+Databases created before auto_vacuum was enabled need one full VACUUM to
+switch over:
+
+    python -m db.maintenance --vacuum
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every worker maintains
+    fcntl = None
+
+from config import get_settings
+from db import database, tenants
+from utils import admission
+
+settings = get_settings()
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+ANALYSIS_LIMIT = 1000  # rows sampled per index by ANALYZE
+
+# When each step last ran in this process (unix time), per tenant
+_last_runs: dict = {}
+
+# Maintenance locks held by this process, per tenant
+_lock_files: dict = {}
+
+# (mtime, size) of each tenant's database and WAL after its last pass
+_file_states: dict = {}
+
+# One file per worker process holding its latest "<requests per second> <in flight>"
+TRAFFIC_DIR = database.DATABASE_PATH + ".traffic"
+
+
+def last_runs() -> dict:
+    """Step -> time it last ran, for the current tenant."""
+    return _last_runs.setdefault(tenants.current(), {
+        "checkpoint": None, "truncate": None, "analyze": None, "vacuum": None,
+    })
+
+
+def _holds_lock() -> bool:
+    """Take (or keep) the current tenant's maintenance lock; False if another process has it."""
+    tenant = tenants.current()
+    if fcntl is None or tenant in _lock_files:
+        return True
+    lock_file = open(database.database_path() + ".maintenance.lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _lock_files[tenant] = lock_file
+    return True
+
+
+@tenants.on_evict
+def _release(tenant: str):
+    # Another worker that still has the tenant open takes over
+    lock_file = _lock_files.pop(tenant, None)
+    if lock_file is not None:
+        lock_file.close()
+    _last_runs.pop(tenant, None)
+    _file_states.pop(tenant, None)
+
+
+def _file_state() -> tuple:
+    """(mtime, size) of the current tenant's database and WAL files."""
+    path = database.database_path()
+    state = []
+    for file in (path, path + "-wal"):
+        try:
+            stat = os.stat(file)
+        except FileNotFoundError:
+            state.append(None)
+        else:
+            state.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(state)
+
+
+def _traffic() -> tuple:
+    """(requests served, requests in flight) for this worker, ignoring event streams."""
+    return admission.traffic["total"], admission.traffic["in_flight"]
+
+
+def _traffic_file() -> str:
+    return os.path.join(TRAFFIC_DIR, str(os.getpid()))
+
+
+def _share_traffic(rate: float, in_flight: int):
+    """Publish this worker's load for the others."""
+    os.makedirs(TRAFFIC_DIR, exist_ok=True)
+    tmp_path = _traffic_file() + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(f"{rate} {in_flight}")
+    os.replace(tmp_path, _traffic_file())
+
+
+def _server_traffic() -> tuple:
+    """(requests per second, requests in flight) summed over the workers that reported recently."""
+    stale = time.time() - 3 * settings.MAINTENANCE_INTERVAL
+    total_rate, total_in_flight = 0.0, 0
+    for name in os.listdir(TRAFFIC_DIR):
+        path = os.path.join(TRAFFIC_DIR, name)
+        try:
+            if name.endswith(".tmp") or os.path.getmtime(path) < stale:
+                continue  # half written, or a worker that has exited
+            with open(path) as f:
+                rate, in_flight = f.read().split()
+        except (OSError, ValueError):
+            continue
+        total_rate += float(rate)
+        total_in_flight += int(in_flight)
+    return total_rate, total_in_flight
+
+
+async def _pragma(db, sql: str):
+    cursor = await db.execute(sql)
+    return await cursor.fetchall()
+
+
+async def database_stats() -> dict:
+    """File, free-page and WAL sizes of the current tenant's database, for the health endpoint."""
+    path = database.database_path()
+    async with database.connect() as db:
+        page_size = (await _pragma(db, "PRAGMA page_size"))[0][0]
+        page_count = (await _pragma(db, "PRAGMA page_count"))[0][0]
+        free_pages = (await _pragma(db, "PRAGMA freelist_count"))[0][0]
+        journal_mode = (await _pragma(db, "PRAGMA journal_mode"))[0][0]
+        auto_vacuum = (await _pragma(db, "PRAGMA auto_vacuum"))[0][0]
+
+    wal_path = path + "-wal"
+    return {
+        "file_size": os.path.getsize(path),
+        "wal_size": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+        "page_size": page_size,
+        "page_count": page_count,
+        "free_pages": free_pages,
+        "free_bytes": free_pages * page_size,
+        "journal_mode": journal_mode,
+        "auto_vacuum": AUTO_VACUUM_MODES.get(auto_vacuum, auto_vacuum),
+        "last_maintenance": dict(last_runs()),
+    }
+
+
+async def maintain(db, idle: bool, force: bool = False):
+    """One maintenance pass on connection `db` to the current tenant's database."""
+    now = time.time()
+    runs = last_runs()
+    journal_mode = (await _pragma(db, "PRAGMA journal_mode"))[0][0]
+    if journal_mode == "wal":
+        wal_path = database.database_path() + "-wal"
+        wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+        if idle and wal_size > settings.MAINTENANCE_WAL_TRUNCATE_MB * 1024 * 1024:
+            # Resets the WAL to zero bytes; gives up (busy) if readers still need it
+            busy, _, _ = (await _pragma(db, "PRAGMA wal_checkpoint(TRUNCATE)"))[0]
+            if not busy:
+                runs["truncate"] = now
+                print(f"🧹 WAL truncated ({wal_size / 1024 / 1024:.1f} MB)")
+        else:
+            await _pragma(db, "PRAGMA wal_checkpoint(PASSIVE)")
+            runs["checkpoint"] = now
+
+    if not idle:
+        return
+
+    analyzed = runs["analyze"]
+    if force or analyzed is None or now - analyzed > settings.MAINTENANCE_ANALYZE_HOURS * 3600:
+        started = time.perf_counter()
+        await _pragma(db, f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        await _pragma(db, "ANALYZE")
+        await _pragma(db, "PRAGMA optimize")
+        runs["analyze"] = now
+        print(f"🧹 ANALYZE done in {time.perf_counter() - started:.2f}s")
+
+    auto_vacuum = (await _pragma(db, "PRAGMA auto_vacuum"))[0][0]
+    free_pages = (await _pragma(db, "PRAGMA freelist_count"))[0][0]
+    if auto_vacuum == 2 and (force or free_pages > settings.MAINTENANCE_VACUUM_MIN_FREE_PAGES):
+        # Small steps keep the write lock short; the next idle tick continues.
+        # executescript() steps the pragma to completion; execute() would free one page.
+        await db.executescript(f"PRAGMA incremental_vacuum({settings.MAINTENANCE_VACUUM_PAGES})")
+        runs["vacuum"] = now
+
+
+async def _maintain_open_tenants(idle: bool):
+    for tenant in tenants.open_tenants():
+        with tenants.use(tenant):
+            if not _holds_lock():
+                continue
+            if not tenants.pool(tenant).is_active() and _file_states.get(tenant) == _file_state():
+                # Nothing written since the last pass
+                continue
+            try:
+                async with database.connect() as db:
+                    await maintain(db, idle=idle)
+            except sqlite3.OperationalError as e:
+                # Database busy; try again next tick
+                print(f"⚠️  Database maintenance ({tenant}): {e}")
+                continue
+            _file_states[tenant] = _file_state()
+
+
+async def run_maintenance():
+    """Background task started from the app lifespan."""
+    last_count, _ = _traffic()
+    try:
+        while True:
+            await asyncio.sleep(settings.MAINTENANCE_INTERVAL)
+            count, in_flight = _traffic()
+            rate = (count - last_count) / settings.MAINTENANCE_INTERVAL
+            last_count = count
+            try:
+                _share_traffic(rate, in_flight)
+                rate, in_flight = _server_traffic()
+            except OSError as e:
+                # Fall back to this worker's own figures
+                print(f"⚠️  Database maintenance: could not share traffic: {e}")
+            idle = rate <= settings.MAINTENANCE_IDLE_RPS and in_flight == 0
+            await _maintain_open_tenants(idle)
+    finally:
+        try:
+            os.remove(_traffic_file())
+        except OSError:
+            pass
+
+
+async def full_vacuum():
+    """Rebuild the file with auto_vacuum=INCREMENTAL (blocks writers while it runs)."""
+    async with database.connect() as db:
+        await _pragma(db, "PRAGMA auto_vacuum = INCREMENTAL")
+        await _pragma(db, "VACUUM")
+
+
+async def _main(vacuum: bool):
+    if vacuum:
+        await full_vacuum()
+        print("✓ VACUUM complete; auto_vacuum is now incremental")
+    async with database.connect() as db:
+        await maintain(db, idle=True, force=True)
+    for key, value in (await database_stats()).items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run SQLite maintenance on gallery.db once")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="full VACUUM first; switches older databases to incremental auto_vacuum")
+    parser.add_argument("--tenant", default=tenants.DEFAULT_TENANT,
+                        help=f"maintain {settings.TENANT_DIR}/<tenant>.db instead")
+    args = parser.parse_args()
+    if not tenants.exists(args.tenant):
+        parser.error(f"unknown tenant: {args.tenant}")
+    with tenants.use(args.tenant):
+        asyncio.run(_main(args.vacuum))
@@ -0,0 +1,203 @@
+"""
+Query profiler - per-request query counts, slow-query log and plan checks
+"""
+import re
+import sqlite3
+import time
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from typing import Optional
+
+import aiosqlite
+from aiosqlite.context import contextmanager
+
+from config import get_settings
+
+settings = get_settings()
+
+# Profile of the request currently being served (None outside requests)
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("query_profile", default=None)
+
+# Summaries of the last N finished requests, newest last
+recent_profiles: deque = deque(maxlen=settings.QUERY_PROFILE_HISTORY)
+
+# EXPLAIN QUERY PLAN output per distinct statement (plans are static for our
+# SQL), least recently used first; statements with inlined values would
+# otherwise add an entry each
+_plan_cache: OrderedDict = OrderedDict()
+PLAN_CACHE_SIZE = 256
+
+_WHITESPACE = re.compile(r"\s+")
+_FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+_LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace so the same statement always maps to the same key."""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def is_full_scan(plan: list) -> bool:
+    """True if any step of the plan walks a whole table without an index."""
+    return any(_FULL_SCAN.match(step) for step in plan)
+
+
+def is_bounded_scan(sql: str, plan: list) -> bool:
+    """
+    A table scan that stops after LIMIT rows: read in rowid order (e.g.
+    ORDER BY id DESC LIMIT ?), with no temp B-tree sorting the whole table
+    first. Cheap however large the table, so not reported as a full scan.
+    """
+    return bool(_LIMIT.search(sql)) and not any(step.startswith("USE TEMP B-TREE") for step in plan)
+
+
+class RequestProfile:
+    """Queries issued while serving a single request."""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.status_code: Optional[int] = None
+        self.started_at = time.time()
+        self.queries: list = []
+
+    def record(self, sql: str, elapsed_ms: float, plan: Optional[list]):
+        self.queries.append({"sql": sql, "ms": elapsed_ms, "plan": plan})
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(q["ms"] for q in self.queries)
+
+    def n_plus_one(self) -> list:
+        """Statements repeated often enough to look like a query-per-row loop."""
+        counts = Counter(q["sql"] for q in self.queries)
+        return [
+            {"sql": sql, "count": n}
+            for sql, n in counts.items()
+            if n >= settings.N_PLUS_ONE_THRESHOLD
+        ]
+
+    def summary(self) -> dict:
+        scans = {q["sql"]: q["plan"] for q in self.queries if q["plan"] and is_full_scan(q["plan"])}
+        bounded_scans = sorted(sql for sql, plan in scans.items() if is_bounded_scan(sql, plan))
+        full_scans = sorted(sql for sql in scans if sql not in bounded_scans)
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "query_count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "slow_queries": [
+                {"sql": q["sql"], "ms": round(q["ms"], 2), "plan": q["plan"]}
+                for q in self.queries
+                if q["ms"] >= settings.SLOW_QUERY_MS
+            ],
+            "full_scans": full_scans,
+            "bounded_scans": bounded_scans,
+            "n_plus_one": self.n_plus_one(),
+        }
+
+
+def begin_request(method: str, path: str):
+    """Start collecting queries for a request. Returns (profile, token)."""
+    profile = RequestProfile(method, path)
+    return profile, _current_profile.set(profile)
+
+
+def end_request(profile: RequestProfile, token, status_code: int):
+    """Stop collecting and keep the summary in the recent-requests ring."""
+    _current_profile.reset(token)
+    profile.status_code = status_code
+    summary = profile.summary()
+    recent_profiles.append(summary)
+
+    for item in summary["n_plus_one"]:
+        print(f"⚠️  Possible N+1 on {profile.method} {profile.path}: "
+              f"{item['count']}x {item['sql']}")
+    return summary
+
+
+class QueryProfilerMiddleware:
+    """ASGI middleware; counts the queries each request issues, exposing the totals as debug headers.
+
+    The profile ends once the whole response has been sent, so queries a
+    streamed body runs (utils/streaming.py) are counted with its request.
+    The headers go out first and only include the queries made until then.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile, token = begin_request(scope["method"], scope["path"])
+        status_code = 500
+
+        async def send_with_headers(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.DEBUG:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-query-count", str(profile.count).encode()),
+                        (b"x-query-time-ms", f"{profile.total_ms:.2f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            end_request(profile, token, status_code)
+
+
+class ProfiledConnection(aiosqlite.Connection):
+    """aiosqlite connection that times every execute() call."""
+
+    async def _explain(self, sql: str, parameters) -> Optional[list]:
+        if not sql.upper().startswith(_EXPLAINABLE):
+            return None
+        if sql in _plan_cache:
+            _plan_cache.move_to_end(sql)
+            return _plan_cache[sql]
+        try:
+            rows = await super().execute_fetchall(f"EXPLAIN QUERY PLAN {sql}", parameters)
+        except sqlite3.Error:
+            return None
+        plan = [row[3] for row in rows]
+        _plan_cache[sql] = plan
+        if len(_plan_cache) > PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+        return plan
+
+    @contextmanager
+    async def execute(self, sql: str, parameters=None) -> aiosqlite.Cursor:
+        if parameters is None:
+            parameters = []
+
+        start = time.perf_counter()
+        cursor = await super().execute(sql, parameters)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        key = normalize_sql(sql)
+        plan = await self._explain(key, parameters)
+
+        if elapsed_ms >= settings.SLOW_QUERY_MS:
+            print(f"🐢 Slow query ({elapsed_ms:.1f} ms): {key}")
+            for step in plan or []:
+                print(f"     plan: {step}")
+
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.record(key, elapsed_ms, plan)
+
+        return cursor
@@ -0,0 +1,257 @@
+"""
+Tenants - one SQLite file per gallery, opened lazily and closed when idle
+
+With TENANT_MODE set, utils/tenancy.py works out the tenant of every
+request (by host name or a /t/<tenant> path prefix) and activates it for
+the request; db.database.connect() then opens that tenant's file. The
+default tenant keeps gallery.db, every other one lives in
+TENANT_DIR/<tenant>.db. New galleries are created with
+
+    python manage_tenants.py create <tenant> [--email ... --password ...]
+
+Each open tenant has a small pool of idle connections. A tenant is opened
+(schema checked, migrations applied) on its first request in a worker and
+closed again after TENANT_IDLE_SECONDS without requests, or as soon as
+more than TENANT_MAX_OPEN tenants are open; modules that keep per-tenant
+state register on_evict() hooks to drop it at the same time.
+
+Open tenants cost next to nothing while nobody uses them: background
+tasks (cache watcher, notification tailer, job polls) mostly visit
+active_tenants(), those with a request in the last TENANT_ACTIVE_SECONDS,
+and the idle connections of the others are closed.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config import get_settings
+from db.profiler import ProfiledConnection
+
+settings = get_settings()
+
+DEFAULT_TENANT = "default"
+# Lowercase DNS label; also safe inside file names and URL paths
+TENANT_NAME = re.compile(r"^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$")
+
+_current: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+# Open tenants, least recently used first
+_pools: OrderedDict = OrderedDict()
+_evict_hooks: list = []
+
+
+def current() -> str:
+    """The tenant of the request (or background step) being served."""
+    return _current.get()
+
+
+@contextmanager
+def use(tenant: str):
+    """Make `tenant` current for the enclosed block (background tasks, CLI)."""
+    token = _current.set(tenant)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def tenant_file(tenant: str) -> str:
+    return os.path.join(settings.TENANT_DIR, f"{tenant}.db")
+
+
+def exists(tenant: str) -> bool:
+    return tenant == DEFAULT_TENANT or (
+        TENANT_NAME.match(tenant) is not None and os.path.exists(tenant_file(tenant))
+    )
+
+
+class PooledConnection(ProfiledConnection):
+    """Goes back to its tenant's pool on close() while the pool has room."""
+
+    def __init__(self, pool: "TenantPool", connector):
+        super().__init__(connector, 64)
+        self._pool = pool
+        # Idle pooled connections must not keep the interpreter alive at exit
+        self.daemon = True
+
+    def __await__(self):
+        if self.is_alive():
+            # Reused from the pool: the worker thread is already running
+            return self._connect().__await__()
+        return super().__await__()
+
+    async def close(self):
+        if not self._pool.release(self):
+            await super().close()
+
+    async def discard(self):
+        """Really close, whether or not the pool has room."""
+        await super().close()
+
+
+class TenantPool:
+    """Idle connections and request bookkeeping for one open tenant."""
+
+    def __init__(self, tenant: str):
+        self.tenant = tenant
+        self.ready = False
+        self.closed = False
+        self.active = 0  # requests in flight
+        self.last_used = time.monotonic()
+        self.opened = 0  # connections created
+        self._idle: list = []
+        self._lock = asyncio.Lock()
+
+    def acquire(self, connector) -> PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if conn._running and conn.is_alive():
+                return conn
+        self.opened += 1
+        return PooledConnection(self, connector)
+
+    def release(self, conn: PooledConnection) -> bool:
+        """Keep `conn` for reuse; False if it should really be closed."""
+        if (self.closed or conn._connection is None or not conn._running
+                or conn.in_transaction or len(self._idle) >= settings.TENANT_POOL_SIZE):
+            return False
+        conn.row_factory = None
+        self._idle.append(conn)
+        return True
+
+    async def trim(self):
+        """Close the idle connections; new ones are opened on demand."""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.discard()
+
+    async def close(self):
+        self.closed = True
+        await self.trim()
+
+    def is_active(self) -> bool:
+        """A request in flight, or one within TENANT_ACTIVE_SECONDS."""
+        return (self.tenant == DEFAULT_TENANT or self.active > 0
+                or time.monotonic() - self.last_used < settings.TENANT_ACTIVE_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "idle_connections": len(self._idle),
+            "connections_opened": self.opened,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+        }
+
+
+def pool(tenant: str = None) -> TenantPool:
+    tenant = tenant or current()
+    tenant_pool = _pools.get(tenant)
+    if tenant_pool is None:
+        tenant_pool = _pools[tenant] = TenantPool(tenant)
+    return tenant_pool
+
+
+def open_tenants() -> list:
+    """Tenants this worker has opened, for background tasks to visit."""
+    return [tenant for tenant, tenant_pool in _pools.items() if tenant_pool.ready]
+
+
+def active_tenants() -> list:
+    """Open tenants that served a request recently; the default tenant always counts."""
+    return [tenant for tenant, tenant_pool in _pools.items() if tenant_pool.ready and tenant_pool.is_active()]
+
+
+def on_evict(hook):
+    """Register `hook(tenant)`, called when a tenant is closed."""
+    _evict_hooks.append(hook)
+    return hook
+
+
+async def open_tenant(tenant: str, setup) -> TenantPool:
+    """Open `tenant` in this worker unless it is open: `await setup()` runs once, with the tenant current."""
+    tenant_pool = pool(tenant)
+    if not tenant_pool.ready:
+        async with tenant_pool._lock:
+            if not tenant_pool.ready:
+                with use(tenant):
+                    await setup()
+                tenant_pool.ready = True
+                if tenant != DEFAULT_TENANT:
+                    print(f"🏷️  Tenant opened: {tenant}")
+        await _evict_over_limit()
+    return tenant_pool
+
+
+async def checkout(tenant: str, setup) -> TenantPool:
+    """Mark a request in flight for `tenant`, which stays open until checkin()."""
+    tenant_pool = pool(tenant)
+    _pools.move_to_end(tenant)
+    tenant_pool.active += 1
+    tenant_pool.last_used = time.monotonic()
+    try:
+        return await open_tenant(tenant, setup)
+    except BaseException:
+        tenant_pool.active -= 1
+        raise
+
+
+def checkin(tenant_pool: TenantPool):
+    tenant_pool.active -= 1
+    tenant_pool.last_used = time.monotonic()
+
+
+async def evict(tenant: str):
+    tenant_pool = _pools.pop(tenant, None)
+    if tenant_pool is None:
+        return
+    # Hooks run before the first await, so a request that reopens the
+    # tenant meanwhile never loses its fresh state to them
+    for hook in _evict_hooks:
+        hook(tenant)
+    await tenant_pool.close()
+    if tenant != DEFAULT_TENANT:
+        print(f"🏷️  Tenant closed: {tenant}")
+
+
+def _evictable(tenant: str, tenant_pool: TenantPool) -> bool:
+    return tenant != DEFAULT_TENANT and tenant_pool.active == 0
+
+
+async def _evict_over_limit():
+    excess = len(_pools) - settings.TENANT_MAX_OPEN
+    for tenant, tenant_pool in list(_pools.items()):
+        if excess <= 0:
+            break
+        if _evictable(tenant, tenant_pool):
+            await evict(tenant)
+            excess -= 1
+
+
+async def evict_idle_tenants():
+    """Background task: close tenants nobody has asked for in TENANT_IDLE_SECONDS.
+
+    Tenants that are merely inactive stay open but give up their idle
+    connections (and the threads behind them).
+    """
+    interval = max(1.0, min(60.0, settings.TENANT_IDLE_SECONDS / 4, settings.TENANT_ACTIVE_SECONDS))
+    while True:
+        await asyncio.sleep(interval)
+        cutoff = time.monotonic() - settings.TENANT_IDLE_SECONDS
+        for tenant, tenant_pool in list(_pools.items()):
+            if _evictable(tenant, tenant_pool) and tenant_pool.last_used < cutoff:
+                await evict(tenant)
+            elif not tenant_pool.is_active():
+                await tenant_pool.trim()
+
+
+async def close_all():
+    for tenant in list(_pools):
+        await evict(tenant)
+
+
+def stats() -> dict:
+    return {tenant: tenant_pool.stats() for tenant, tenant_pool in _pools.items()}
@@ -0,0 +1,11 @@
+"""
+Durable background jobs
+
+Handlers call `await enqueue("task_name", {...})` and return immediately;
+workers started from the app lifespan pick the job up from the `jobs`
+table, so queued work survives restarts.
+"""
+from jobs.queue import enqueue, get_job, list_jobs, start_workers, stop_workers, task
+
+# Import task modules so their handlers are registered
+from jobs import tasks  # noqa: E402,F401
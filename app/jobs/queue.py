@@ -0,0 +1,324 @@
+"""
+SQLite-backed job queue with asyncio workers
+
+Statuses: queued -> running -> done | failed, with 'retry' for jobs
+waiting to run again.
+
+- priority: higher runs first, FIFO within a priority
+- retries: failed jobs move to 'retry' with exponential backoff until
+  max_attempts is reached
+- dedup_key: at most one 'queued' job per key; enqueueing a duplicate
+  returns the existing job instead of adding another. Jobs in 'retry'
+  don't count, since they may already have done part of their work.
+- leases: a job left 'running' by a crashed process goes back to 'retry'
+  once its lease (JOB_LEASE_SECONDS) expires
+- retention: done and failed jobs are deleted JOB_RETENTION_DAYS after
+  they finished, checked hourly while the workers are idle
+- tenants: every tenant database has its own jobs table; workers take
+  turns over the tenants this process has open and run each job with its
+  tenant current. Tenants without recent requests are polled only every
+  TENANT_IDLE_POLL_SECONDS (enqueue() still wakes the workers at once)
+- polls are cheap: the write lock is only taken when a plain read found
+  a job due or a lease expired
+"""
+import asyncio
+import json
+import random
+import sqlite3
+import time
+import traceback
+
+import aiosqlite
+
+from config import get_settings
+from db import tenants
+from db.database import connect
+from utils import notifications
+
+settings = get_settings()
+
+_handlers: dict = {}
+# Set by enqueue() so idle workers in this process start without waiting for a poll
+_wakeup = None
+# Tenant -> monotonic time of its last prune of finished jobs
+_last_prune: dict = {}
+# Tenant -> monotonic time before which an inactive tenant isn't polled again
+_next_poll: dict = {}
+
+
+def task(name: str):
+    """Register an async function `fn(payload) -> result` as a job handler."""
+    def decorator(fn):
+        _handlers[name] = fn
+        return fn
+    return decorator
+
+
+def _row_to_job(row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
+
+
+async def enqueue(
+    name: str,
+    payload: dict = None,
+    priority: int = 0,
+    dedup_key: str = None,
+    max_attempts: int = None,
+    delay: float = 0,
+) -> int:
+    """Queue a job and return its id (or the id of the queued duplicate)."""
+    if name not in _handlers:
+        raise ValueError(f"Unknown job: {name}")
+
+    async with connect() as db:
+        job_id = None
+        while job_id is None:
+            try:
+                cursor = await db.execute(
+                    """INSERT INTO jobs (name, payload, priority, dedup_key, max_attempts, run_after)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (name, json.dumps(payload or {}), priority, dedup_key,
+                     max_attempts or settings.JOB_MAX_ATTEMPTS, time.time() + delay)
+                )
+                job_id = cursor.lastrowid
+            except sqlite3.IntegrityError:
+                # A job with this dedup_key is already waiting; it will cover this request too.
+                # If a worker claimed it in the meantime, loop and insert a fresh one.
+                cursor = await db.execute(
+                    "SELECT id FROM jobs WHERE dedup_key = ? AND status = 'queued'", (dedup_key,)
+                )
+                row = await cursor.fetchone()
+                job_id = row[0] if row else None
+        await db.commit()
+
+    if _wakeup is not None:
+        _wakeup.set()
+    return job_id
+
+
+async def get_job(job_id: int):
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        row = await cursor.fetchone()
+    return _row_to_job(row) if row else None
+
+
+async def list_jobs(status: str = None, limit: int = 50) -> list:
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        if status:
+            cursor = await db.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)
+            )
+        else:
+            cursor = await db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        rows = await cursor.fetchall()
+    return [_row_to_job(row) for row in rows]
+
+
+async def _claim(db):
+    """Atomically move the next due job to 'running'. Safe across processes."""
+    now = time.time()
+    # Most polls find nothing: check without the write lock first
+    cursor = await db.execute(
+        """SELECT 1 FROM jobs WHERE (status IN ('queued', 'retry') AND run_after <= ?)
+           OR (status = 'running' AND locked_until < ?) LIMIT 1""",
+        (now, now)
+    )
+    if await cursor.fetchone() is None:
+        return None
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        # Recover jobs whose worker died mid-run
+        await db.execute(
+            "UPDATE jobs SET status = 'retry' WHERE status = 'running' AND locked_until < ?",
+            (now,)
+        )
+        cursor = await db.execute(
+            """SELECT * FROM jobs WHERE status IN ('queued', 'retry') AND run_after <= ?
+               ORDER BY priority DESC, id ASC LIMIT 1""",
+            (now,)
+        )
+        row = await cursor.fetchone()
+        if row is not None:
+            await db.execute(
+                """UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                   locked_until = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?""",
+                (now + settings.JOB_LEASE_SECONDS, row["id"])
+            )
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    if row is None:
+        return None
+    job = _row_to_job(row)
+    job["attempts"] += 1
+    return job
+
+
+async def _finish(db, job: dict, result):
+    await db.execute(
+        """UPDATE jobs SET status = 'done', result = ?, last_error = NULL,
+           locked_until = NULL, updated_at = CURRENT_TIMESTAMP WHERE id = ?""",
+        (json.dumps(result), job["id"])
+    )
+    await db.commit()
+    return "done"
+
+
+async def _fail(db, job: dict, error: str):
+    if job["attempts"] >= job["max_attempts"]:
+        status, run_after = "failed", job["run_after"]
+    else:
+        backoff = min(
+            settings.JOB_BACKOFF_BASE * 2 ** (job["attempts"] - 1),
+            settings.JOB_BACKOFF_MAX
+        )
+        status, run_after = "retry", time.time() + backoff * random.uniform(0.8, 1.2)
+    await db.execute(
+        """UPDATE jobs SET status = ?, run_after = ?, last_error = ?,
+           locked_until = NULL, updated_at = CURRENT_TIMESTAMP WHERE id = ?""",
+        (status, run_after, error, job["id"])
+    )
+    await db.commit()
+    return status
+
+
+async def _release(db, job: dict):
+    """Put an interrupted job back without counting the attempt."""
+    await db.execute(
+        """UPDATE jobs SET status = 'retry', attempts = attempts - 1,
+           locked_until = NULL WHERE id = ?""",
+        (job["id"],)
+    )
+    await db.commit()
+
+
+async def _run_next(worker_id: int) -> bool:
+    """Claim and run the next due job of the current tenant. False if none was due."""
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        try:
+            job = await _claim(db)
+        except sqlite3.OperationalError as e:
+            # Database busy (another process claiming); try again shortly
+            print(f"⚠️  Job worker {worker_id}: {e}")
+            return False
+        if job is None:
+            return False
+
+        handler = _handlers.get(job["name"])
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job '{job['name']}'")
+            result = await handler(job["payload"])
+        except asyncio.CancelledError:
+            await asyncio.shield(_release(db, job))
+            raise
+        except Exception as e:
+            print(f"❌ Job {job['id']} ({job['name']}) attempt {job['attempts']} failed: {e}")
+            outcome = _fail(db, job, "".join(traceback.format_exception_only(type(e), e)).strip())
+        else:
+            outcome = _finish(db, job, result)
+
+        try:
+            status = await outcome
+        except sqlite3.Error as e:
+            # The lease expires and the job is retried; keep the worker alive
+            await db.rollback()
+            print(f"⚠️  Job worker {worker_id}: could not record job {job['id']}: {e}")
+            return True
+
+    await notifications.publish(
+        f"job.{status}", f"Job {job['name']} #{job['id']}: {status}",
+        f"/api/admin/jobs/{job['id']}",
+        {"id": job["id"], "name": job["name"], "status": status, "attempts": job["attempts"]}
+    )
+    return True
+
+
+async def _prune(worker_id: int):
+    """Delete the current tenant's finished jobs past retention, at most once an hour."""
+    tenant = tenants.current()
+    last = _last_prune.get(tenant)
+    if last is not None and time.monotonic() - last < 3600:
+        return
+    _last_prune[tenant] = time.monotonic()
+    try:
+        async with connect() as db:
+            cursor = await db.execute(
+                """DELETE FROM jobs WHERE status IN ('done', 'failed')
+                   AND updated_at < datetime('now', ?)""",
+                (f"-{settings.JOB_RETENTION_DAYS} days",)
+            )
+            await db.commit()
+    except sqlite3.OperationalError as e:
+        print(f"⚠️  Job worker {worker_id}: could not prune jobs: {e}")
+        return
+    if cursor.rowcount:
+        print(f"🧹 Pruned {cursor.rowcount} finished job(s) ({tenant})")
+
+
+@tenants.on_evict
+def _forget_prune(tenant: str):
+    _last_prune.pop(tenant, None)
+    _next_poll.pop(tenant, None)
+
+
+def _due_tenants(woken: bool) -> list:
+    """Open tenants to poll now: the active ones, the rest every TENANT_IDLE_POLL_SECONDS."""
+    if woken:
+        return tenants.open_tenants()
+    now = time.monotonic()
+    due = []
+    for tenant in tenants.open_tenants():
+        if tenants.pool(tenant).is_active():
+            _next_poll.pop(tenant, None)
+        elif now < _next_poll.get(tenant, 0):
+            continue
+        else:
+            _next_poll[tenant] = now + settings.TENANT_IDLE_POLL_SECONDS
+        due.append(tenant)
+    return due
+
+
+async def _worker(worker_id: int):
+    woken = True
+    while True:
+        ran = False
+        for tenant in _due_tenants(woken):
+            with tenants.use(tenant):
+                if await _run_next(worker_id):
+                    # More may be waiting: poll it again straight away
+                    _next_poll.pop(tenant, None)
+                    ran = True
+        woken = False
+
+        if not ran:
+            for tenant in tenants.open_tenants():
+                with tenants.use(tenant):
+                    await _prune(worker_id)
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), settings.JOB_POLL_INTERVAL)
+                woken = True
+            except asyncio.TimeoutError:
+                woken = False
+
+
+def start_workers() -> list:
+    """Start JOB_WORKERS worker tasks on the running event loop."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    return [asyncio.create_task(_worker(i)) for i in range(settings.JOB_WORKERS)]
+
+
+async def stop_workers(workers: list):
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,31 @@
+"""
+Job handlers
+"""
+from db.database import connect
+from jobs.queue import task
+from utils.cache import invalidate_all
+from utils.metadata import fetch_og_tags
+
+
+@task("renumber_videos")
+async def renumber_videos(payload: dict) -> dict:
+    """Close gaps in order_index left by deletes, keeping the current order."""
+    async with connect() as db:
+        cursor = await db.execute("""
+            UPDATE videos SET order_index = ranked.position
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY order_index, id) - 1 AS position
+                FROM videos
+            ) AS ranked
+            WHERE videos.id = ranked.id AND videos.order_index != ranked.position
+        """)
+        updated = cursor.rowcount
+        await db.commit()
+    invalidate_all()
+    return {"updated": updated}
+
+
+@task("fetch_metadata")
+async def fetch_metadata(payload: dict) -> dict:
+    """Fetch OpenGraph tags for payload["url"]."""
+    return await fetch_og_tags(payload["url"])
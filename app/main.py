@@ -7,6 +7,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, RedirectResponse
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import re
 import aiosqlite
@@ -14,13 +15,19 @@ from datetime import datetime
 
 from config import get_settings
 from db.database import init_db, create_default_admin, DATABASE_PATH
-from routers import auth, public, upload, utils, videos
+from db import maintenance, profiler, tenants
+import jobs
+from utils import cache, notifications, tenancy
+from utils.admission import AdmissionMiddleware
+from utils.streaming import EventStreamGZipMiddleware
+from utils.tenancy import TenantMiddleware
+from routers import admin, auth, catalog, public, upload, utils, videos
 from routers.auth import UnauthenticatedPageException
 
 settings = get_settings()
 
 # Setup templates
-templates = Jinja2Templates(directory="templates")
+templates = Jinja2Templates(directory="templates", context_processors=[tenancy.template_context])
 templates.env.globals["now"] = datetime.now()
 
 
@@ -28,13 +35,29 @@ templates.env.globals["now"] = datetime.now()
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     print("🚀 Starting Safebox Video Gallery API...")
-    await init_db()
+    await tenants.open_tenant(tenants.DEFAULT_TENANT, init_db)
     await create_default_admin()
     print("✓ Database initialized")
+    if settings.TENANT_MODE:
+        os.makedirs(settings.TENANT_DIR, exist_ok=True)
+        print(f"✓ Tenants resolved by {settings.TENANT_MODE}, databases in {settings.TENANT_DIR}/")
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     os.makedirs("static/js", exist_ok=True)
+    cache_watcher = asyncio.create_task(cache.watch_versions())
+    job_workers = jobs.start_workers()
+    upload_sweeper = asyncio.create_task(upload.expire_upload_sessions())
+    notification_tailer = asyncio.create_task(notifications.tail_notifications())
+    db_maintenance = asyncio.create_task(maintenance.run_maintenance())
+    tenant_evictor = asyncio.create_task(tenants.evict_idle_tenants())
     yield
     print("👋 Shutting down Safebox Video Gallery API...")
+    await jobs.stop_workers(job_workers)
+    background = [tenant_evictor, db_maintenance, notification_tailer, upload_sweeper, cache_watcher]
+    for task in background:
+        task.cancel()
+    # Let them close their database connections before the loop goes away
+    await asyncio.gather(*background, return_exceptions=True)
+    await tenants.close_all()
 
 
 app = FastAPI(
@@ -46,15 +69,29 @@ app = FastAPI(
     redoc_url=None
 )
 
-# CORS middleware
+# Compress larger responses (JSON API, listing pages); event streams go out as they are
+app.add_middleware(EventStreamGZipMiddleware, minimum_size=1024)
+
+# Query counts per request, including queries run while a body streams
+app.add_middleware(profiler.QueryProfilerMiddleware)
+
+# Admission control runs early so shed requests cost as little as possible
+app.add_middleware(AdmissionMiddleware)
+
+# CORS middleware; wraps admission so shed 503/429 responses carry the
+# CORS headers too, and cross-origin clients can read their Retry-After
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# Outermost: everything below runs with the request's tenant current
+app.add_middleware(TenantMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -73,8 +110,10 @@ async def unauthenticated_page_handler(request: Request, exc):
 app.include_router(auth.router)
 app.include_router(videos.router)
 app.include_router(public.router)
+app.include_router(catalog.router)
 app.include_router(upload.router)
 app.include_router(utils.router)
+app.include_router(admin.router)
 
 
 # Template routes are now handled in routers/public.py
@@ -105,10 +144,16 @@ async def admin_settings_page(request: Request):
 
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy", "app": settings.APP_NAME}
+    """Health check endpoint, with database file/WAL sizes."""
+    return {
+        "status": "healthy",
+        "app": settings.APP_NAME,
+        "database": await maintenance.database_stats(),
+        "open_tenants": len(tenants.open_tenants()),
+    }
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=80, reload=True)
+    # Development server; use serve.py for multi-worker production mode
+    uvicorn.run("main:app", host=settings.HOST, port=settings.PORT, reload=True)
@@ -0,0 +1,56 @@
+"""
+Create and list tenant galleries (TENANT_DIR/<tenant>.db)
+
+    python manage_tenants.py create <tenant> [--email EMAIL] [--password PASSWORD]
+    python manage_tenants.py list
+"""
+import argparse
+import asyncio
+import os
+
+from config import get_settings
+from db import tenants
+from db.database import init_db, create_default_admin
+
+settings = get_settings()
+
+
+async def create(tenant: str, email: str, password: str):
+    os.makedirs(settings.TENANT_DIR, exist_ok=True)
+    with tenants.use(tenant):
+        await init_db()
+        await create_default_admin(email, password)
+    await tenants.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage tenant galleries")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    new = commands.add_parser("create", help=f"create {settings.TENANT_DIR}/<tenant>.db with an admin")
+    new.add_argument("tenant", help="lowercase letters, digits and dashes")
+    new.add_argument("--email", default=settings.DEFAULT_ADMIN_EMAIL)
+    new.add_argument("--password", default=settings.DEFAULT_ADMIN_PASSWORD)
+
+    commands.add_parser("list", help="list tenant databases")
+
+    args = parser.parse_args()
+
+    if args.command == "create":
+        if not tenants.TENANT_NAME.match(args.tenant) or args.tenant == tenants.DEFAULT_TENANT:
+            parser.error(f"invalid tenant name: {args.tenant!r}")
+        if tenants.exists(args.tenant):
+            parser.error(f"tenant already exists: {tenants.tenant_file(args.tenant)}")
+        asyncio.run(create(args.tenant, args.email, args.password))
+        print(f"✓ Created {tenants.tenant_file(args.tenant)} (admin: {args.email})")
+    else:
+        if not os.path.isdir(settings.TENANT_DIR):
+            return
+        for name in sorted(os.listdir(settings.TENANT_DIR)):
+            if name.endswith(".db"):
+                size = os.path.getsize(os.path.join(settings.TENANT_DIR, name))
+                print(f"  {name[:-3]}: {size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
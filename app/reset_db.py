@@ -10,6 +10,10 @@ async def reset_database():
     if os.path.exists(DATABASE_PATH):
         try:
             os.remove(DATABASE_PATH)
+            # A leftover WAL would be replayed into the new database
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(DATABASE_PATH + suffix):
+                    os.remove(DATABASE_PATH + suffix)
             print(f"✓ Removed existing database: {DATABASE_PATH}")
         except Exception as e:
             print(f"❌ Failed to remove database: {e}")
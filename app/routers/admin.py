@@ -0,0 +1,162 @@
+"""
+Admin operations router - diagnostics and maintenance endpoints
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from config import get_settings
+from db import backup, profiler
+import jobs
+from routers.auth import get_current_admin
+from routers.videos import DASHBOARD_PAGE_SIZE, query_videos, suggest_videos
+from utils import admission, notifications
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+settings = get_settings()
+
+# Only one hot backup at a time
+_backup_lock = asyncio.Lock()
+
+
+@router.get("/videos")
+async def list_videos(
+    q: str = None,
+    has_next: bool = None,
+    sort: str = "order",
+    order: str = "asc",
+    limit: int = DASHBOARD_PAGE_SIZE,
+    cursor: str = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Paged dashboard listing: title-prefix filter, sort by order/title/created."""
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    return await query_videos(q, has_next, sort, order == "desc", limit, cursor)
+
+
+@router.get("/videos/suggest")
+async def suggest_next_video(
+    q: str,
+    exclude: str = None,
+    limit: int = 10,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Typeahead for the next-video picker: top title-prefix matches."""
+    return {"videos": await suggest_videos(q, exclude, limit)}
+
+
+@router.get("/events")
+async def event_stream(
+    since: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None),
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    Server-Sent Events stream of admin notifications. A reconnecting client
+    sends Last-Event-ID (or ?since= when it opens a fresh EventSource) and
+    first receives everything it missed.
+    """
+    if last_event_id is None:
+        last_event_id = since
+
+    async def stream():
+        # Subscribe before replaying so nothing published meanwhile is lost
+        hub = notifications.get_hub()
+        since = hub.last_id if hub.last_id is not None else await notifications.latest_id()
+        subscriber = hub.subscribe(since)
+        last_id = since if last_event_id is None else last_event_id
+        try:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+            while True:
+                missed = await notifications.fetch_since(last_id, 500)
+                for event in missed:
+                    yield notifications.format_event(event)
+                    last_id = event["id"]
+                if len(missed) < 500:
+                    break
+
+            while not subscriber.dropped:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event["id"] > last_id:
+                    yield notifications.format_event(event)
+                    last_id = event["id"]
+            # Dropped as a slow consumer: ending the stream makes the client resume
+        finally:
+            hub.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: don't buffer the stream
+    })
+
+
+@router.get("/notifications")
+async def recent_notifications(
+    limit: int = 50,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Most recent notifications, newest first, plus this worker's hub counters."""
+    limit = max(1, min(limit, 500))
+    return {"notifications": await notifications.recent(limit), "hub": notifications.get_hub().stats()}
+
+
+@router.get("/queries")
+async def recent_queries(
+    limit: int = 20,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Query profile of the most recent requests, newest first."""
+    summaries = list(profiler.recent_profiles)[-limit:]
+    summaries.reverse()
+    return {"requests": summaries}
+
+
+@router.get("/admission")
+async def admission_metrics(current_admin: dict = Depends(get_current_admin)):
+    """Admission-control counters per route class (this worker process)."""
+    return {"classes": admission.stats()}
+
+
+@router.post("/backup")
+async def create_backup(
+    compress: bool = True,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Take a hot backup of the live database into BACKUP_DIR."""
+    if _backup_lock.locked():
+        raise HTTPException(status_code=409, detail="A backup is already running")
+    async with _backup_lock:
+        # Runs in a worker thread; the incremental copy keeps the DB available meanwhile
+        return await asyncio.to_thread(backup.snapshot, None, compress)
+
+
+@router.get("/backups")
+async def list_backups(current_admin: dict = Depends(get_current_admin)):
+    """List existing backups, newest first."""
+    return {"backups": backup.list_snapshots()}
+
+
+@router.get("/jobs")
+async def list_jobs(
+    status: str = None,
+    limit: int = 50,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Recent background jobs, optionally filtered by status (queued, running, retry, done, failed)."""
+    return {"jobs": await jobs.list_jobs(status, min(limit, 500))}
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: int, current_admin: dict = Depends(get_current_admin)):
+    """Status, attempts and result of a background job."""
+    job = await jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from fastapi.responses import JSONResponse
 from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
 import aiosqlite
 
 from db.database import get_db
@@ -14,6 +15,7 @@ from schemas.auth import (
     ProfileUpdate, PasswordChange
 )
 from utils.security import verify_password, create_access_token, decode_token, get_password_hash
+from utils.cache import admin_cache, invalidate_all
 from config import get_settings
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
@@ -23,6 +25,11 @@ COOKIE_NAME = "admin_session"
 COOKIE_MAX_AGE = 60 * 60 * 24 * 10  # 10 days in seconds
 
 
+def cookie_path(request: Request) -> str:
+    """Scope the session cookie to the tenant's /t/<tenant> prefix in path mode."""
+    return request.scope.get("root_path") or "/"
+
+
 async def get_current_admin(
     request: Request,
     db: aiosqlite.Connection = Depends(get_db)
@@ -51,17 +58,22 @@ async def get_current_admin(
             detail="Invalid token payload",
         )
     
-    cursor = await db.execute(
-        "SELECT * FROM admins WHERE email = ?",
-        (email,)
-    )
-    admin = await cursor.fetchone()
-    
+    admin = admin_cache.get(email)
     if admin is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Admin not found",
+        generation = admin_cache.generation()
+        cursor = await db.execute(
+            "SELECT * FROM admins WHERE email = ?",
+            (email,)
         )
+        admin = await cursor.fetchone()
+        
+        if admin is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Admin not found",
+            )
+        admin = dict(admin)
+        admin_cache.set(email, admin, generation)
     
     return dict(admin)
 
@@ -89,6 +101,7 @@ async def get_current_admin_html(
 @router.post("/login")
 async def login(
     login_data: LoginRequest,
+    request: Request,
     response: Response,
     db: aiosqlite.Connection = Depends(get_db)
 ):
@@ -99,7 +112,8 @@ async def login(
     )
     admin = await cursor.fetchone()
     
-    if not admin or not verify_password(login_data.password, admin["password_hash"]):
+    # bcrypt is deliberately slow; keep it off the event loop
+    if not admin or not await asyncio.to_thread(verify_password, login_data.password, admin["password_hash"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -117,7 +131,8 @@ async def login(
         max_age=COOKIE_MAX_AGE,
         httponly=True,
         samesite="lax",
-        secure=False  # Set to True in production with HTTPS
+        secure=False,  # Set to True in production with HTTPS
+        path=cookie_path(request),
     )
     
     return {"message": "Login successful", "redirect": "/admin/dashboard"}
@@ -190,6 +205,7 @@ async def update_profile(
         params
     )
     await db.commit()
+    invalidate_all()
     
     cursor = await db.execute(
         "SELECT id, email, name, profile_image_url, created_at, updated_at FROM admins WHERE id = ?",
@@ -215,15 +231,16 @@ async def change_password(
     )
     admin = await cursor.fetchone()
     
-    if not verify_password(password_data.current_password, admin["password_hash"]):
+    if not await asyncio.to_thread(verify_password, password_data.current_password, admin["password_hash"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
-    new_hash = get_password_hash(password_data.new_password)
+    new_hash = await asyncio.to_thread(get_password_hash, password_data.new_password)
     await db.execute(
         "UPDATE admins SET password_hash = ?, updated_at = ? WHERE id = ?",
         (new_hash, datetime.now().isoformat(), current_admin["id"])
     )
     await db.commit()
+    invalidate_all()
     
     return {"message": "Password updated successfully"}
 
@@ -232,7 +249,7 @@ async def change_password(
 
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(request: Request, response: Response):
     """Logout endpoint - clears the auth cookie."""
-    response.delete_cookie(key=COOKIE_NAME)
+    response.delete_cookie(key=COOKIE_NAME, path=cookie_path(request))
     return {"message": "Logged out successfully", "redirect": "/admin/login"}
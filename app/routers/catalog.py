@@ -0,0 +1,213 @@
+"""
+Public read-only JSON catalog API (v1)
+
+Lean alternative to scraping the HTML pages: `fields=` projection is
+pushed down into the SELECT, listings use keyset cursors instead of
+OFFSET, and every response carries an ETag and Cache-Control so clients
+can revalidate cheaply.
+"""
+import hashlib
+
+from fastapi import APIRouter, HTTPException, Request, Response
+import aiosqlite
+
+from config import get_settings
+from db.database import connect
+from utils.cache import catalog_cache
+from utils.pagination import decode_cursor, encode_cursor
+from utils.serializers import dumps
+
+router = APIRouter(prefix="/api/v1", tags=["Catalog API"])
+settings = get_settings()
+
+VIDEO_FIELDS = (
+    "id", "title", "description", "video_link", "youtube_id",
+    "next_video_id", "order_index", "created_at", "updated_at",
+)
+DEFAULT_FIELDS = ("id", "title", "youtube_id", "next_video_id", "order_index", "created_at")
+MAX_PAGE_SIZE = 100
+MAX_PATH_LENGTH = 200
+# Page size of /videos and its "load more" fragments (templates/all_videos.html)
+LISTING_PAGE_SIZE = 6
+# Pages precached by the service worker besides listing fragments and videos
+SHELL_PATHS = ("", "videos", "guide", "static/css/tailwind.js", "static/js/api.js")
+
+
+def parse_fields(fields: str = None) -> list:
+    """Validate a comma-separated field list against the video columns."""
+    if not fields:
+        return list(DEFAULT_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in VIDEO_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(VIDEO_FIELDS)}"
+        )
+    return list(dict.fromkeys(requested))
+
+
+def cached_json(request: Request, body: bytes, cache_control: str = None) -> Response:
+    """JSON response with a content-hash ETag; answers 304 when it still matches."""
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control or f"public, max-age={settings.API_CACHE_MAX_AGE}",
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def select_columns(fields: list) -> str:
+    # Columns come from the VIDEO_FIELDS whitelist, never from raw input
+    return ", ".join(fields)
+
+
+async def load_page(fields: list, limit: int, after: tuple = None) -> bytes:
+    columns = list(dict.fromkeys([*fields, "id", "order_index"]))
+    sql = f"SELECT {select_columns(columns)} FROM videos"
+    params = []
+    if after is not None:
+        sql += " WHERE (order_index, id) > (?, ?)"
+        params.extend(after)
+    sql += " ORDER BY order_index, id LIMIT ?"
+    params.append(limit + 1)
+
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql, params)
+        rows = await cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["order_index"], rows[-1]["id"])
+
+    return dumps({
+        "data": [{f: row[f] for f in fields} for row in rows],
+        "next_cursor": next_cursor,
+    })
+
+
+async def load_video(fields: list, id: str):
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"SELECT {select_columns(fields)} FROM videos WHERE id = ?", (id,)
+        )
+        row = await cursor.fetchone()
+    return dumps({"data": dict(row)}) if row else None
+
+
+async def load_path(fields: list, id: str, max_length: int):
+    """Follow the next_video_id chain from `id` in a single recursive query."""
+    columns = list(dict.fromkeys([*fields, "id"]))
+    sql = f"""
+        WITH RECURSIVE path(id, depth) AS (
+            SELECT id, 0 FROM videos WHERE id = ?
+            UNION ALL
+            SELECT v.next_video_id, path.depth + 1
+            FROM videos v JOIN path ON v.id = path.id
+            WHERE v.next_video_id IS NOT NULL AND path.depth + 1 < ?
+        )
+        SELECT {", ".join(f"videos.{c}" for c in columns)}
+        FROM path JOIN videos ON videos.id = path.id
+        ORDER BY path.depth
+    """
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql, (id, max_length))
+        rows = await cursor.fetchall()
+
+    if not rows:
+        return None
+
+    # Stop at the first repeat in case admins linked the path into a loop
+    seen = set()
+    sequence = []
+    for row in rows:
+        if row["id"] in seen:
+            break
+        seen.add(row["id"])
+        sequence.append({f: row[f] for f in fields})
+    return dumps({"data": sequence})
+
+
+@router.get("/videos")
+async def list_videos(request: Request, fields: str = None, limit: int = 20, cursor: str = None):
+    """Catalog in display order, `limit` videos per page (max 100)."""
+    selected = parse_fields(fields)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after = None
+    if cursor:
+        order_index, id = decode_cursor(cursor)
+        if not isinstance(order_index, int) or not isinstance(id, str):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = (order_index, id)
+
+    body = await catalog_cache.get_or_load(
+        ("api:videos", tuple(selected), limit, after),
+        lambda: load_page(selected, limit, after)
+    )
+    return cached_json(request, body)
+
+
+@router.get("/videos/{id}")
+async def get_video(request: Request, id: str, fields: str = None):
+    """A single video."""
+    selected = parse_fields(fields)
+    body = await catalog_cache.get_or_load(
+        ("api:video", tuple(selected), id),
+        lambda: load_video(selected, id)
+    )
+    if body is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    return cached_json(request, body)
+
+
+@router.get("/videos/{id}/path")
+async def get_learning_path(request: Request, id: str, fields: str = None, max_length: int = 50):
+    """The learning path starting at a video, following next_video_id links."""
+    selected = parse_fields(fields)
+    max_length = max(1, min(max_length, MAX_PATH_LENGTH))
+    body = await catalog_cache.get_or_load(
+        ("api:path", tuple(selected), id, max_length),
+        lambda: load_path(selected, id, max_length)
+    )
+    if body is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    return cached_json(request, body)
+
+
+async def load_manifest() -> bytes:
+    async with connect() as db:
+        cursor = await db.execute("SELECT version FROM catalog_version")
+        version = (await cursor.fetchone())[0]
+        cursor = await db.execute("SELECT COUNT(*) FROM videos")
+        count = (await cursor.fetchone())[0]
+        cursor = await db.execute(
+            "SELECT id FROM videos ORDER BY order_index, id LIMIT ?",
+            (settings.SW_PRECACHE_VIDEOS,)
+        )
+        ids = [row[0] for row in await cursor.fetchall()]
+
+    last_fragment = min(count, LISTING_PAGE_SIZE * (settings.SW_PRECACHE_PAGES + 1))
+    fragments = [f"videos/partial?skip={skip}" for skip in range(LISTING_PAGE_SIZE, last_fragment, LISTING_PAGE_SIZE)]
+    return dumps({
+        "version": version,
+        "videos": count,
+        "precache": [*SHELL_PATHS, *fragments, *(f"video/{id}" for id in ids)],
+    })
+
+
+@router.get("/manifest")
+async def get_manifest(request: Request):
+    """Catalog version and the pages offline clients (static/js/sw.js) should keep.
+
+    `version` changes whenever a video is added, edited, reordered or
+    deleted. `precache` paths are relative to the gallery root. Always
+    revalidated, so an unchanged catalog costs clients a 304.
+    """
+    body = await catalog_cache.get_or_load("api:manifest", load_manifest)
+    return cached_json(request, body, cache_control="no-cache")
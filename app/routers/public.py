@@ -3,30 +3,79 @@
 Public video gallery endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 import aiosqlite
 from datetime import datetime
 
-from db.database import DATABASE_PATH
+from db.database import connect
+from utils import hints, tenancy
+from utils.cache import catalog_cache, page_cache
+from utils.streaming import StreamingTemplates, iter_rows
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
+templates = Jinja2Templates(directory="templates", context_processors=[tenancy.template_context])
 templates.env.globals["now"] = datetime.now()
+streaming_templates = StreamingTemplates(directory="templates", context_processors=[tenancy.template_context])
+
+# Partial pages up to this size are cached; larger ones are streamed
+CACHED_PAGE_LIMIT = 24
+# Columns used by components/video_card_list.html
+CARD_COLUMNS = "id, title, description, youtube_id, order_index, created_at"
+
+
+async def count_videos() -> int:
+    async with connect() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM videos")
+        return (await cursor.fetchone())[0]
+
+
+async def fetch_video_page(skip: int, limit: int) -> list:
+    """
+    Videos in display order. Pages the UI asks for (skip a multiple of
+    limit) are cached until the catalog changes, unless they are empty.
+    """
+    async def load():
+        async with connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM videos ORDER BY order_index ASC LIMIT ? OFFSET ?",
+                (limit, skip)
+            )
+            return [dict(row) for row in await cursor.fetchall()]
+
+    if limit <= 0 or skip < 0 or skip % limit:
+        return await load()
+    return await page_cache.get_or_load(("page", skip, limit), load, keep=bool)
+
+
+async def fetch_video_with_next(id: str):
+    """Return (video, next_video) as dicts; video is None if it doesn't exist."""
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM videos WHERE id = ?", (id,))
+        video = await cursor.fetchone()
+        
+        if not video:
+            return None, None
+        
+        # Fetch next video if linked
+        next_video = None
+        if video["next_video_id"]:
+            cursor = await db.execute(
+                "SELECT id, title, youtube_id FROM videos WHERE id = ?", 
+                (video["next_video_id"],)
+            )
+            next_video = await cursor.fetchone()
+        
+    return dict(video), dict(next_video) if next_video else None
 
 
 @router.get("/", response_class=HTMLResponse, name="home")
 async def home_page(request: Request):
     """Home page - Shows first 6 videos."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        # Get only first 6 videos for homepage (ordered first to last)
-        cursor = await db.execute("SELECT * FROM videos ORDER BY order_index ASC LIMIT 6")
-        videos = await cursor.fetchall()
-        
-        # Get total count for "View All" button
-        cursor = await db.execute("SELECT COUNT(*) as count FROM videos")
-        total_count = (await cursor.fetchone())["count"]
+    videos = await fetch_video_page(0, 6)
+    total_count = await catalog_cache.get_or_load("count", count_videos)
         
     return templates.TemplateResponse("home.html", {
         "request": request, 
@@ -40,11 +89,8 @@ async def home_page(request: Request):
 @router.get("/videos", response_class=HTMLResponse, name="all_videos")
 async def all_videos_page(request: Request):
     """All videos page with step-by-step guide."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        # Initial load limit to 6
-        cursor = await db.execute("SELECT * FROM videos ORDER BY order_index ASC LIMIT 6")
-        videos = await cursor.fetchall()
+    # Initial load limit to 6
+    videos = await fetch_video_page(0, 6)
         
     return templates.TemplateResponse("all_videos.html", {
         "request": request, 
@@ -57,18 +103,19 @@ async def all_videos_page(request: Request):
 @router.get("/videos/partial", response_class=HTMLResponse)
 async def videos_partial(request: Request, skip: int = 0, limit: int = 6):
     """Fetch partial video list for load more functionality."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute(
-            "SELECT * FROM videos ORDER BY order_index ASC LIMIT ? OFFSET ?", 
-            (limit, skip)
-        )
-        videos = await cursor.fetchall()
-        
-    return templates.TemplateResponse("components/video_card_list.html", {
-        "request": request,
-        "videos": videos
-    })
+    if 0 <= limit <= CACHED_PAGE_LIMIT:
+        videos = await fetch_video_page(skip, limit)
+        return templates.TemplateResponse("components/video_card_list.html", {
+            "request": request,
+            "videos": videos
+        })
+
+    # Large (or unlimited, limit < 0) listings stream straight from the cursor
+    rows = iter_rows(
+        f"SELECT {CARD_COLUMNS} FROM videos ORDER BY order_index ASC LIMIT ? OFFSET ?",
+        (limit, skip)
+    )
+    return streaming_templates.stream(request, "components/video_card_list.html", {"videos": rows})
 
 
 
@@ -77,25 +124,25 @@ async def docs_page(request: Request):
     """Documentation page."""
     return templates.TemplateResponse("docs.html", {"request": request})
 
+@router.get("/sw.js", include_in_schema=False)
+async def service_worker():
+    """Offline service worker, served from the gallery root so it controls every public page."""
+    return FileResponse(
+        "static/js/sw.js",
+        media_type="application/javascript",
+        headers={"Cache-Control": "no-cache"},
+    )
+
 @router.get("/video/{id}", response_class=HTMLResponse, name="video_detail")
 async def video_page(request: Request, id: str):
     """Video player page."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM videos WHERE id = ?", (id,))
-        video = await cursor.fetchone()
+    # Only videos that exist are cached; unknown ids always reach the database
+    video, next_video = await page_cache.get_or_load(
+        ("video", id), lambda: fetch_video_with_next(id), keep=lambda found: found[0] is not None
+    )
         
-        if not video:
-            return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
-        
-        # Fetch next video if linked
-        next_video = None
-        if video["next_video_id"]:
-            cursor = await db.execute(
-                "SELECT id, title, youtube_id FROM videos WHERE id = ?", 
-                (video["next_video_id"],)
-            )
-            next_video = await cursor.fetchone()
+    if not video:
+        return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
         
     return templates.TemplateResponse("video.html", {
         "request": request, 
@@ -103,4 +150,4 @@ async def video_page(request: Request, id: str):
         "next_video": next_video,
         "show_footer": False,
         "title": video["title"]
-    })
+    }, headers={"Link": hints.video_page_links(request, video, next_video)})
@@ -1,21 +1,79 @@
 """
 File upload router for images and videos
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
+import aiosqlite
+import asyncio
+import hashlib
 import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import time
 import uuid
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows: chunks are only serialised within one process
+    fcntl = None
+
 from routers.auth import get_current_admin
 from config import get_settings
+from db import tenants
+from db.database import connect
+from schemas.upload import ResumableUploadCreate, ResumableUploadFinalize
+from storage import get_storage
+from utils import mp4, notifications
 
 router = APIRouter(prefix="/api", tags=["Uploads"])
 settings = get_settings()
 
-# Ensure upload directory exists
-UPLOAD_PATH = os.path.join(os.path.dirname(__file__), "..", settings.UPLOAD_DIR)
-os.makedirs(UPLOAD_PATH, exist_ok=True)
+SESSION_PATH = os.path.join(os.path.dirname(__file__), "..", settings.RESUMABLE_UPLOAD_DIR)
+os.makedirs(SESSION_PATH, exist_ok=True)
+
+TUS_VERSION = "1.0.0"
+HASH_BUFFER = 1024 * 1024
+
+# Uploads with a PATCH in progress in this process (the lock without fcntl)
+_appending: set = set()
+
+
+def get_file_type(content_type: str) -> str:
+    """Map an allowed content type to "image" or "video"; 400 otherwise."""
+    if content_type in settings.ALLOWED_IMAGE_TYPES:
+        return "image"
+    if content_type in settings.ALLOWED_VIDEO_TYPES:
+        return "video"
+    raise HTTPException(
+        status_code=400,
+        detail=f"File type not allowed. Allowed types: images ({', '.join(settings.ALLOWED_IMAGE_TYPES)}), videos ({', '.join(settings.ALLOWED_VIDEO_TYPES)})"
+    )
+
+
+def prepare_video(path: str, content_type: str):
+    """
+    Post-upload stage for self-hosted videos: move the MP4 index (moov) in
+    front of the media data so playback can start before the whole file
+    is downloaded, and read duration and dimensions. Runs in a thread.
+    Returns None for non-MP4 files or files that can't be parsed.
+    """
+    if content_type != "video/mp4":
+        return None
+    try:
+        rewritten = mp4.faststart(path)
+        info = mp4.probe(path)
+    except (mp4.MP4Error, struct.error) as e:
+        print(f"⚠️  Could not process MP4 {os.path.basename(path)}: {e}")
+        return None
+    info["rewritten"] = rewritten
+    return info
+
+
+def unique_filename(original: str) -> str:
+    ext = os.path.splitext(original or "")[1] or ".bin"
+    return f"{uuid.uuid4().hex}{ext}"
 
 
 @router.post("/admin/upload")
@@ -26,51 +84,323 @@ async def upload_file(
     """Upload an image or video file."""
     # Validate file type
     content_type = file.content_type or ""
+    file_type = get_file_type(content_type)
     
-    if content_type in settings.ALLOWED_IMAGE_TYPES:
-        file_type = "image"
-    elif content_type in settings.ALLOWED_VIDEO_TYPES:
-        file_type = "video"
-    else:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type not allowed. Allowed types: images ({', '.join(settings.ALLOWED_IMAGE_TYPES)}), videos ({', '.join(settings.ALLOWED_VIDEO_TYPES)})"
-        )
-    
-    # Read file content
-    content = await file.read()
+    # Check file size without reading the (spooled) body into memory
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
     
-    # Check file size
-    if len(content) > settings.MAX_FILE_SIZE:
+    if size > settings.MAX_FILE_SIZE:
         raise HTTPException(
             status_code=400,
             detail=f"File too large. Maximum size: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
         )
     
     # Generate unique filename
-    ext = os.path.splitext(file.filename or "")[1] or ".bin"
-    unique_name = f"{uuid.uuid4().hex}{ext}"
-    file_path = os.path.join(UPLOAD_PATH, unique_name)
+    unique_name = unique_filename(file.filename)
     
-    # Save file
-    with open(file_path, "wb") as f:
-        f.write(content)
+    media = None
+    if content_type == "video/mp4":
+        # Faststart needs a real file to rewrite before it goes to storage
+        fd, tmp_path = tempfile.mkstemp(dir=SESSION_PATH, suffix=".mp4")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                await asyncio.to_thread(shutil.copyfileobj, file.file, tmp, HASH_BUFFER)
+            media = await asyncio.to_thread(prepare_video, tmp_path, content_type)
+            await get_storage().save_file(unique_name, tmp_path, content_type)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    else:
+        # Save file to the configured storage backend
+        await get_storage().save(unique_name, file.file, content_type)
+    
+    await notifications.publish(
+        "upload.completed", f"Upload finished: {file.filename}",
+        f"/api/uploads/{unique_name}", {"filename": unique_name, "type": file_type, "size": size}
+    )
     
     # Return URL
     return {
         "url": f"/api/uploads/{unique_name}",
         "filename": file.filename,
         "type": file_type,
-        "size": len(content)
+        "size": size,
+        "media": media
     }
 
 
 @router.get("/uploads/{filename}")
 async def get_uploaded_file(filename: str):
-    """Serve an uploaded file."""
-    file_path = os.path.join(UPLOAD_PATH, filename)
-    
-    if not os.path.exists(file_path):
+    """Serve an uploaded file (or redirect to it for remote backends)."""
+    try:
+        return await get_storage().response(filename)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
-    
-    return FileResponse(file_path)
+
+
+# ============ Resumable Uploads (tus-style) ============
+#
+#   POST   /api/admin/uploads                 create a session   -> 201, Location
+#   HEAD   /api/admin/uploads/{id}            current offset     -> Upload-Offset
+#   PATCH  /api/admin/uploads/{id}            append bytes at Upload-Offset
+#   POST   /api/admin/uploads/{id}/finalize   verify and store the file
+#   DELETE /api/admin/uploads/{id}            abort
+#
+# The bytes received so far live in RESUMABLE_UPLOAD_DIR/{id}.part and the
+# file size is the authoritative offset, so a dropped PATCH resumes from
+# whatever actually reached the disk. A PATCH holds an exclusive flock()
+# on the part file while it checks the offset and appends, so concurrent
+# or retried PATCHes can't interleave, whichever worker process they reach.
+# Without fcntl (Windows) the lock only covers the process itself.
+
+
+def session_file(upload_id: str) -> str:
+    return os.path.join(SESSION_PATH, f"{os.path.basename(upload_id)}.part")
+
+
+def current_offset(upload_id: str) -> int:
+    try:
+        return os.path.getsize(session_file(upload_id))
+    except FileNotFoundError:
+        return 0
+
+
+def lock_part_file(f, upload_id: str) -> bool:
+    """Take the append lock on an open part file; False if another PATCH holds it.
+
+    With fcntl the lock is released when the file is closed; without it
+    the caller must discard upload_id from _appending when done.
+    """
+    if fcntl is None:
+        if upload_id in _appending:
+            return False
+        _appending.add(upload_id)
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def upload_headers(session: dict, offset: int) -> dict:
+    return {
+        "Tus-Resumable": TUS_VERSION,
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(session["length"]),
+        "Upload-Expires": datetime.fromtimestamp(
+            session["updated_at"] + settings.RESUMABLE_UPLOAD_EXPIRY_HOURS * 3600
+        ).isoformat(timespec="seconds"),
+        "Cache-Control": "no-store",
+    }
+
+
+async def get_session(upload_id: str, admin: dict) -> dict:
+    """The upload session, if it exists and was started by `admin`; 404 otherwise."""
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT * FROM upload_sessions WHERE id = ? AND admin_id = ?",
+            (upload_id, admin["id"])
+        )
+        session = await cursor.fetchone()
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return dict(session)
+
+
+async def remove_session(upload_id: str):
+    async with connect() as db:
+        await db.execute("DELETE FROM upload_sessions WHERE id = ?", (upload_id,))
+        await db.commit()
+    try:
+        os.remove(session_file(upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_BUFFER):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@router.post("/admin/uploads", status_code=201)
+async def create_upload_session(
+    data: ResumableUploadCreate,
+    response: Response,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Start a resumable upload."""
+    file_type = get_file_type(data.content_type)
+    if data.size > settings.RESUMABLE_MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large. Maximum size: {settings.RESUMABLE_MAX_FILE_SIZE // (1024*1024)}MB"
+        )
+
+    upload_id = uuid.uuid4().hex
+    now = time.time()
+    async with connect() as db:
+        await db.execute(
+            """INSERT INTO upload_sessions
+               (id, filename, content_type, file_type, length, checksum, admin_id, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (upload_id, data.filename, data.content_type, file_type, data.size,
+             data.checksum.lower() if data.checksum else None, current_admin["id"], now, now)
+        )
+        await db.commit()
+    open(session_file(upload_id), "wb").close()
+
+    location = f"/api/admin/uploads/{upload_id}"
+    response.headers["Location"] = location
+    response.headers["Tus-Resumable"] = TUS_VERSION
+    return {"upload_id": upload_id, "location": location, "offset": 0, "length": data.size}
+
+
+@router.head("/admin/uploads/{upload_id}")
+async def upload_session_offset(upload_id: str, current_admin: dict = Depends(get_current_admin)):
+    """Report how many bytes of the upload have been received."""
+    session = await get_session(upload_id, current_admin)
+    return Response(status_code=200, headers=upload_headers(session, current_offset(upload_id)))
+
+
+@router.get("/admin/uploads/{upload_id}")
+async def upload_session_status(upload_id: str, current_admin: dict = Depends(get_current_admin)):
+    """Same as HEAD, as JSON."""
+    session = await get_session(upload_id, current_admin)
+    return {
+        "upload_id": upload_id,
+        "filename": session["filename"],
+        "offset": current_offset(upload_id),
+        "length": session["length"],
+    }
+
+
+@router.patch("/admin/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Append the request body at Upload-Offset, streaming it straight to disk."""
+    session = await get_session(upload_id, current_admin)
+    try:
+        client_offset = int(request.headers["upload-offset"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Missing or invalid Upload-Offset header")
+
+    with open(session_file(upload_id), "ab") as f:
+        # The offset is only trusted under the lock
+        if not lock_part_file(f, upload_id):
+            raise HTTPException(
+                status_code=409,
+                detail="Another chunk for this upload is in progress",
+                headers=upload_headers(session, current_offset(upload_id)),
+            )
+        try:
+            offset = os.fstat(f.fileno()).st_size
+            if client_offset != offset:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Offset mismatch: server has {offset} bytes",
+                    headers=upload_headers(session, offset),
+                )
+
+            remaining = session["length"] - offset
+            async for chunk in request.stream():
+                if not chunk:
+                    continue
+                if len(chunk) > remaining:
+                    raise HTTPException(status_code=413, detail="Chunk exceeds the declared upload length")
+                await asyncio.to_thread(f.write, chunk)
+                remaining -= len(chunk)
+        finally:
+            _appending.discard(upload_id)
+
+    offset = session["length"] - remaining
+    session["updated_at"] = time.time()
+    async with connect() as db:
+        await db.execute(
+            "UPDATE upload_sessions SET updated_at = ? WHERE id = ?",
+            (session["updated_at"], upload_id)
+        )
+        await db.commit()
+
+    return Response(status_code=204, headers=upload_headers(session, offset))
+
+
+@router.post("/admin/uploads/{upload_id}/finalize")
+async def finalize_upload(
+    upload_id: str,
+    data: ResumableUploadFinalize = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """Verify the completed upload and move it into storage."""
+    session = await get_session(upload_id, current_admin)
+    offset = current_offset(upload_id)
+    if offset != session["length"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {offset} of {session['length']} bytes received"
+        )
+
+    expected = (data.checksum if data and data.checksum else session["checksum"])
+    if expected:
+        actual = await asyncio.to_thread(sha256_file, session_file(upload_id))
+        if actual != expected.lower():
+            await remove_session(upload_id)
+            raise HTTPException(status_code=422, detail="Checksum mismatch; upload discarded")
+
+    media = await asyncio.to_thread(prepare_video, session_file(upload_id), session["content_type"])
+
+    unique_name = unique_filename(session["filename"])
+    await get_storage().save_file(unique_name, session_file(upload_id), session["content_type"])
+    await remove_session(upload_id)
+
+    await notifications.publish(
+        "upload.completed", f"Upload finished: {session['filename']}",
+        f"/api/uploads/{unique_name}",
+        {"filename": unique_name, "type": session["file_type"], "size": session["length"]}
+    )
+
+    return {
+        "url": f"/api/uploads/{unique_name}",
+        "filename": session["filename"],
+        "type": session["file_type"],
+        "size": session["length"],
+        "media": media
+    }
+
+
+@router.delete("/admin/uploads/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str, current_admin: dict = Depends(get_current_admin)):
+    """Abort a resumable upload and discard the received bytes."""
+    await get_session(upload_id, current_admin)
+    await remove_session(upload_id)
+    return Response(status_code=204)
+
+
+async def expire_upload_sessions():
+    """Background task: remove sessions idle for longer than RESUMABLE_UPLOAD_EXPIRY_HOURS."""
+    while True:
+        cutoff = time.time() - settings.RESUMABLE_UPLOAD_EXPIRY_HOURS * 3600
+        for tenant in tenants.open_tenants():
+            try:
+                with tenants.use(tenant):
+                    async with connect() as db:
+                        cursor = await db.execute("SELECT id FROM upload_sessions WHERE updated_at < ?", (cutoff,))
+                        stale = [row[0] for row in await cursor.fetchall()]
+                    for upload_id in stale:
+                        await remove_session(upload_id)
+            except (sqlite3.Error, OSError) as e:
+                # Try again on the next pass
+                print(f"⚠️  Upload session expiry ({tenant}): {e}")
+                continue
+            if stale:
+                print(f"🧹 Expired {len(stale)} stale upload session(s) ({tenant})")
+        await asyncio.sleep(600)
@@ -1,7 +1,11 @@
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, HttpUrl
+import aiosqlite
+from db.database import connect
+from routers.auth import get_current_admin
 from utils.metadata import fetch_og_tags
+import jobs
 
 router = APIRouter(
     prefix="/utils",
@@ -12,8 +16,26 @@ class MetadataRequest(BaseModel):
     url: HttpUrl
 
 @router.post("/metadata")
-async def get_metadata(request: MetadataRequest):
-    """Fetch OpenGraph metadata for a URL."""
+async def get_metadata(
+    request: MetadataRequest,
+    http_request: Request,
+    background: bool = False
+):
+    """
+    Fetch OpenGraph metadata for a URL.
+    With ?background=true (admins only) the fetch is queued and a job id
+    is returned; poll /api/admin/jobs/{id} for the result.
+    """
+    if background:
+        # Only the admin check needs the database; plain fetches never touch it
+        async with connect() as db:
+            db.row_factory = aiosqlite.Row
+            await get_current_admin(http_request, db)
+        job_id = await jobs.enqueue(
+            "fetch_metadata", {"url": str(request.url)},
+            dedup_key=f"fetch_metadata:{request.url}"
+        )
+        return {"job_id": job_id}
     try:
         data = await fetch_og_tags(str(request.url))
         return data
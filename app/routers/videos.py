@@ -4,13 +4,20 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 import aiosqlite
 from datetime import datetime
-from db.database import DATABASE_PATH
+from db.database import connect
 from config import get_settings
 from routers.auth import get_current_admin, get_current_admin_html
+from utils import notifications, tenancy
+from utils.cache import catalog_cache, invalidate_all
+from utils.pagination import PagedRows, decode_cursor, encode_cursor
+from utils.streaming import StreamingTemplates, iter_rows
+import jobs
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
+templates = Jinja2Templates(directory="templates", context_processors=[tenancy.template_context])
 templates.env.globals["now"] = datetime.now()
+streaming_templates = StreamingTemplates(directory="templates", context_processors=[tenancy.template_context])
+streaming_templates.env.globals["now"] = datetime.now()
 settings = get_settings()
 
 def get_youtube_id(url: str) -> str:
@@ -27,32 +34,142 @@ def get_youtube_id(url: str) -> str:
             return match.group(1)
     return None
 
+# Dashboard listing: sort key -> column (each backed by an index)
+DASHBOARD_SORTS = {
+    "order": "order_index",
+    "title": "title",
+    "created": "created_at",
+}
+DASHBOARD_COLUMNS = "id, title, youtube_id, next_video_id, order_index, created_at"
+DASHBOARD_PAGE_SIZE = 50
+MAX_DASHBOARD_PAGE_SIZE = 200
+
+
+def prefix_range(prefix: str) -> tuple:
+    """Bounds such that `lower <= title < upper` (NOCASE) matches titles starting with prefix."""
+    return prefix, prefix + "\U0010ffff"
+
+
+async def dashboard_stats() -> dict:
+    """Counts shown on the dashboard cards; cached until the next write."""
+    async def load():
+        async with connect() as db:
+            cursor = await db.execute("SELECT COUNT(*) FROM videos")
+            total = (await cursor.fetchone())[0]
+            cursor = await db.execute("SELECT COUNT(*) FROM videos WHERE next_video_id IS NOT NULL")
+            with_next = (await cursor.fetchone())[0]
+        return {"total": total, "with_next": with_next}
+
+    return await catalog_cache.get_or_load("admin:stats", load)
+
+
+def dashboard_query(
+    q: str = None,
+    has_next: bool = None,
+    sort: str = "order",
+    desc: bool = False,
+    limit: int = DASHBOARD_PAGE_SIZE,
+    cursor: str = None,
+) -> tuple:
+    """
+    SQL for one page of the admin listing, as (sql, params, sort column).
+    `q` filters by title prefix, `has_next` by whether a next video is set;
+    pages are keyset cursors on (sort key, id). Selects limit + 1 rows so the
+    caller can tell whether there is a next page.
+    """
+    if sort not in DASHBOARD_SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}")
+    column = DASHBOARD_SORTS[sort]
+    key = f"{column} COLLATE NOCASE" if column == "title" else column
+
+    where, params = [], []
+    if q:
+        where.append("title COLLATE NOCASE >= ? AND title COLLATE NOCASE < ?")
+        params.extend(prefix_range(q))
+    if has_next is not None:
+        # Unary + keeps the planner on the sort index instead of idx_videos_next
+        where.append("+next_video_id IS NOT NULL" if has_next else "+next_video_id IS NULL")
+    if cursor:
+        value, after_id = decode_cursor(cursor)
+        expected = int if sort == "order" else str
+        if not isinstance(value, expected) or not isinstance(after_id, str):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # The plain bound on the sort key lets SQLite seek into the index;
+        # the row-value comparison alone would scan from the start
+        where.append(f"{key} {'<=' if desc else '>='} ? AND ({key}, id) {'<' if desc else '>'} (?, ?)")
+        params.extend([value, value, after_id])
+
+    direction = "DESC" if desc else "ASC"
+    sql = f"SELECT {DASHBOARD_COLUMNS} FROM videos"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {key} {direction}, id {direction} LIMIT ?"
+    params.append(limit + 1)
+    return sql, params, column
+
+
+async def query_videos(
+    q: str = None,
+    has_next: bool = None,
+    sort: str = "order",
+    desc: bool = False,
+    limit: int = DASHBOARD_PAGE_SIZE,
+    cursor: str = None,
+) -> dict:
+    """One page of the admin listing with the cursor for the next one."""
+    limit = max(1, min(limit, MAX_DASHBOARD_PAGE_SIZE))
+    sql, params, column = dashboard_query(q, has_next, sort, desc, limit, cursor)
+
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        rows = await (await db.execute(sql, params)).fetchall()
+
+    videos = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = videos[-1]
+        next_cursor = encode_cursor(last[column], last["id"])
+    return {"videos": videos, "next_cursor": next_cursor}
+
+
+async def suggest_videos(q: str, exclude: str = None, limit: int = 10) -> list:
+    """Top title-prefix matches for the next-video picker."""
+    limit = max(1, min(limit, 25))
+    sql = """SELECT id, title, youtube_id FROM videos
+             WHERE title COLLATE NOCASE >= ? AND title COLLATE NOCASE < ?"""
+    params = list(prefix_range(q))
+    if exclude:
+        sql += " AND id != ?"
+        params.append(exclude)
+    sql += " ORDER BY title COLLATE NOCASE, id LIMIT ?"
+    params.append(limit)
+
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        rows = await (await db.execute(sql, params)).fetchall()
+    return [dict(row) for row in rows]
+
+
 @router.get("/admin/dashboard", response_class=HTMLResponse, name="admin_dashboard")
 async def list_videos(request: Request, user: dict = Depends(get_current_admin_html)):
-    """List videos in admin dashboard."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT * FROM videos ORDER BY order_index ASC")
-        videos = await cursor.fetchall()
-        
-    return templates.TemplateResponse("admin/dashboard.html", {
-        "request": request,
-        "videos": videos,
+    """List videos in admin dashboard; further pages are fetched from /api/admin/videos."""
+    stats = await dashboard_stats()
+    sql, params, column = dashboard_query()
+
+    # Streamed: rows are read from the cursor while the page is being sent
+    return streaming_templates.stream(request, "admin/dashboard.html", {
+        "videos": PagedRows(iter_rows(sql, params), DASHBOARD_PAGE_SIZE, column),
+        "stats": stats,
+        "page_size": DASHBOARD_PAGE_SIZE,
         "user": user
     })
 
 @router.get("/admin/videos/new", response_class=HTMLResponse)
 async def new_video_form(request: Request, user: dict = Depends(get_current_admin_html)):
     """Show add video form."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        cursor = await db.execute("SELECT id, title FROM videos ORDER BY created_at DESC")
-        all_videos = await cursor.fetchall()
-    
     return templates.TemplateResponse("admin/video_form.html", {
         "request": request, 
-        "user": user,
-        "all_videos": all_videos
+        "user": user
     })
 
 @router.post("/admin/videos")
@@ -74,7 +191,7 @@ async def create_video(
     # Handle empty string as None
     next_video_id = next_video_id if next_video_id else None
 
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         # Get next order_index
         cursor = await db.execute("SELECT COALESCE(MAX(order_index), -1) + 1 FROM videos")
         next_order_index = (await cursor.fetchone())[0]
@@ -85,20 +202,24 @@ async def create_video(
             (id, title, description, video_link, youtube_id, next_video_id, next_order_index)
         )
         await db.commit()
+    invalidate_all()
+    await notifications.publish("video.created", f"Video added: {title}", f"/video/{id}", {"id": id})
     
     return RedirectResponse(url="/admin/dashboard", status_code=303)
 
 @router.get("/admin/videos/{id}/edit", response_class=HTMLResponse)
 async def edit_video_form(request: Request, id: str, user: dict = Depends(get_current_admin_html)):
     """Show edit video form."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute("SELECT * FROM videos WHERE id = ?", (id,))
         video = await cursor.fetchone()
         
-        # Get all videos for the dropdown (excluding current)
-        cursor = await db.execute("SELECT id, title FROM videos ORDER BY created_at DESC")
-        all_videos = await cursor.fetchall()
+        # Only the currently linked video is needed; the picker searches the rest
+        next_video = None
+        if video and video["next_video_id"]:
+            cursor = await db.execute("SELECT id, title FROM videos WHERE id = ?", (video["next_video_id"],))
+            next_video = await cursor.fetchone()
         
     if not video:
         return RedirectResponse(url="/admin/dashboard", status_code=303)
@@ -106,8 +227,8 @@ async def edit_video_form(request: Request, id: str, user: dict = Depends(get_cu
     return templates.TemplateResponse("admin/video_form.html", {
         "request": request, 
         "video": video,
-        "user": user,
-        "all_videos": all_videos
+        "next_video": next_video,
+        "user": user
     })
 
 @router.post("/admin/videos/{id}")
@@ -125,7 +246,7 @@ async def update_video(
     # Handle empty string as None
     next_video_id = next_video_id if next_video_id else None
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with connect() as db:
         await db.execute(
             """UPDATE videos 
                SET title = ?, description = ?, video_link = ?, youtube_id = ?, next_video_id = ?, updated_at = CURRENT_TIMESTAMP
@@ -133,28 +254,23 @@ async def update_video(
             (title, description, video_link, youtube_id, next_video_id, id)
         )
         await db.commit()
+    invalidate_all()
+    await notifications.publish("video.updated", f"Video updated: {title}", f"/video/{id}", {"id": id})
     
     return RedirectResponse(url="/admin/dashboard", status_code=303)
 
 @router.post("/admin/videos/{id}/delete")
 async def delete_video(id: str, user: dict = Depends(get_current_admin_html)):
-    """Delete a video and reindex remaining videos."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Get the order_index of the video being deleted
-        cursor = await db.execute("SELECT order_index FROM videos WHERE id = ?", (id,))
-        result = await cursor.fetchone()
-        
-        if result:
-            deleted_index = result[0]
-            
-            # Delete the video
-            await db.execute("DELETE FROM videos WHERE id = ?", (id,))
-            
-            # Decrement order_index for all videos after the deleted one
-            await db.execute(
-                "UPDATE videos SET order_index = order_index - 1 WHERE order_index > ?",
-                (deleted_index,)
-            )
-            await db.commit()
+    """Delete a video; remaining videos are reindexed by a background job."""
+    async with connect() as db:
+        cursor = await db.execute("DELETE FROM videos WHERE id = ? RETURNING title", (id,))
+        deleted = await cursor.fetchall()
+        await db.commit()
+    invalidate_all()
+    
+    if deleted:
+        await notifications.publish("video.deleted", f"Video deleted: {deleted[0][0]}", None, {"id": id})
+        # Close the order_index gap in the background; back-to-back deletes share one job
+        await jobs.enqueue("renumber_videos", priority=10, dedup_key="renumber_videos")
     
     return RedirectResponse(url="/admin/dashboard", status_code=303)
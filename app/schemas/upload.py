@@ -0,0 +1,16 @@
+"""
+Pydantic schemas for resumable uploads
+"""
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class ResumableUploadCreate(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str
+    size: int = Field(..., gt=0)
+    checksum: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$")  # SHA-256 hex of the whole file
+
+
+class ResumableUploadFinalize(BaseModel):
+    checksum: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$")
@@ -0,0 +1,102 @@
+"""
+Production server entry point
+
+    python serve.py [--workers N] [--host HOST] [--port PORT]
+
+Runs one worker process per core (or WORKERS) without the reloader.
+With gunicorn installed the app is imported once in the master and
+forked into uvicorn workers; `kill -HUP <master pid>` replaces workers
+gracefully, letting in-flight requests finish within GRACEFUL_TIMEOUT.
+Without gunicorn (e.g. on Windows) it falls back to uvicorn's own
+multi-process mode.
+
+Per-worker caches stay coherent through utils.cache.watch_versions().
+With more than one worker SECRET_KEY must be set (environment or .env):
+the default is random per process, and a session signed by one worker
+would be rejected by the others.
+"""
+import argparse
+import asyncio
+import multiprocessing
+
+from config import get_settings
+from db import tenants
+from db.database import init_db, create_default_admin
+
+settings = get_settings()
+
+
+def worker_count(requested: int) -> int:
+    return requested or multiprocessing.cpu_count()
+
+
+async def prepare_database():
+    """Create tables and the default admin, then close every connection again."""
+    await init_db()
+    await create_default_admin()
+    # Workers are forked from this process; they must not inherit open handles
+    await tenants.close_all()
+
+
+def run_gunicorn(host: str, port: int, workers: int):
+    from gunicorn.app.base import BaseApplication
+
+    class GalleryApplication(BaseApplication):
+        def __init__(self, options: dict):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    GalleryApplication({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "graceful_timeout": settings.GRACEFUL_TIMEOUT,
+        "max_requests": settings.MAX_REQUESTS,
+        "max_requests_jitter": settings.MAX_REQUESTS // 10,
+    }).run()
+
+
+def run_uvicorn(host: str, port: int, workers: int):
+    import uvicorn
+    uvicorn.run(
+        "main:app", host=host, port=port, workers=workers,
+        timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the gallery with multiple workers")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WORKERS, help="0 = one per CPU core")
+    args = parser.parse_args()
+    workers = worker_count(args.workers)
+    if workers > 1 and "SECRET_KEY" not in settings.model_fields_set:
+        parser.error("SECRET_KEY must be set (environment or .env) to run more than one worker")
+
+    # Create tables and the default admin once, before any worker starts,
+    # so workers don't race each other on a fresh database.
+    asyncio.run(prepare_database())
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print(f"🚀 Starting {workers} uvicorn workers on {args.host}:{args.port} (gunicorn not installed)")
+        run_uvicorn(args.host, args.port, workers)
+        return
+
+    print(f"🚀 Starting {workers} gunicorn workers on {args.host}:{args.port}")
+    run_gunicorn(args.host, args.port, workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,9 @@
  * Uses HTTP-only cookie authentication
  */
 
-const API_BASE = '/api';
+// Tenant path prefix (/t/<tenant>) when galleries are told apart by path; set by the page
+const APP_ROOT = window.APP_ROOT || '';
+const API_BASE = `${APP_ROOT}/api`;
 
 const Auth = {
     isLoggedIn: async () => {
@@ -17,7 +19,7 @@ const Auth = {
     },
     logout: async () => {
         await fetch(`${API_BASE}/auth/logout`, { method: 'POST', credentials: 'include' });
-        window.location.href = '/admin/login';
+        window.location.href = `${APP_ROOT}/admin/login`;
     }
 };
 
@@ -37,7 +39,7 @@ async function apiRequest(endpoint, options = {}) {
 
     if (response.status === 401) {
         if (window.location.pathname.includes('/admin/') && !window.location.pathname.includes('login')) {
-            window.location.href = '/admin/login';
+            window.location.href = `${APP_ROOT}/admin/login`;
         }
         throw new Error('Unauthorized');
     }
@@ -81,6 +83,57 @@ const UploadAPI = {
         }
 
         return response.json();
+    },
+
+    // Resumable upload for large files: sends the file in chunks and
+    // resumes from the server's offset after a dropped connection.
+    uploadResumable: async (file, { chunkSize = 5 * 1024 * 1024, onProgress, retries = 5 } = {}) => {
+        const session = await apiRequest('/admin/uploads', {
+            method: 'POST',
+            body: JSON.stringify({
+                filename: file.name,
+                content_type: file.type,
+                size: file.size
+            })
+        });
+        const url = `${API_BASE}/admin/uploads/${session.upload_id}`;
+        // Ask the server how much actually arrived
+        const serverOffset = async () => {
+            const head = await fetch(url, { method: 'HEAD', credentials: 'include' });
+            const value = parseInt(head.headers.get('Upload-Offset'), 10);
+            if (Number.isNaN(value)) throw new Error(`Could not read the upload offset (${head.status})`);
+            return value;
+        };
+
+        let offset = 0;
+        let failures = 0;
+        while (offset < file.size) {
+            try {
+                const response = await fetch(url, {
+                    method: 'PATCH',
+                    credentials: 'include',
+                    headers: {
+                        'Tus-Resumable': '1.0.0',
+                        'Upload-Offset': String(offset),
+                        'Content-Type': 'application/offset+octet-stream'
+                    },
+                    body: file.slice(offset, offset + chunkSize)
+                });
+                if (!response.ok && response.status !== 409) {
+                    throw new Error(`Chunk upload failed (${response.status})`);
+                }
+                const next = parseInt(response.headers.get('Upload-Offset'), 10);
+                offset = Number.isNaN(next) ? await serverOffset() : next;
+                failures = 0;
+            } catch (e) {
+                if (++failures > retries) throw e;
+                await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** failures));
+                offset = await serverOffset();
+            }
+            if (onProgress) onProgress(offset, file.size);
+        }
+
+        return apiRequest(`/admin/uploads/${session.upload_id}/finalize`, { method: 'POST' });
     }
 };
 
@@ -91,7 +144,44 @@ const UploadAPI = {
 
 
 
+// Live admin notifications over Server-Sent Events. Each event is also
+// dispatched on window as an 'admin:notification' CustomEvent.
+const AdminEvents = {
+    source: null,
+    lastEventId: null,
+
+    connect: (onEvent) => {
+        const types = [
+            'video.created', 'video.updated', 'video.deleted',
+            'upload.completed', 'job.done', 'job.retry', 'job.failed'
+        ];
+        const open = () => {
+            // The browser resends Last-Event-ID on its own reconnects; ?since=
+            // covers the ones we make after the server closed or refused us
+            const query = AdminEvents.lastEventId ? `?since=${AdminEvents.lastEventId}` : '';
+            const source = new EventSource(`${API_BASE}/admin/events${query}`, { withCredentials: true });
+            AdminEvents.source = source;
+
+            const handle = (e) => {
+                AdminEvents.lastEventId = e.lastEventId;
+                const detail = { id: e.lastEventId, ...JSON.parse(e.data) };
+                if (onEvent) onEvent(detail);
+                window.dispatchEvent(new CustomEvent('admin:notification', { detail }));
+            };
+            types.forEach(type => source.addEventListener(type, handle));
+
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    setTimeout(open, 5000 + Math.random() * 5000);
+                }
+            };
+        };
+        open();
+    }
+};
+
 window.Auth = Auth;
 window.TokenManager = { isLoggedIn: Auth.isLoggedIn };  // Backward compatibility
 window.AuthAPI = AuthAPI;
 window.UploadAPI = UploadAPI;
+window.AdminEvents = AdminEvents;
@@ -0,0 +1,159 @@
+/**
+ * Safebox Gallery - Offline Service Worker
+ * Served from <gallery root>/sw.js (routers/public.py) and registered by templates/base.html
+ *
+ * Public pages and "load more" fragments are answered from the cache
+ * straight away. They stay valid until the catalog version in
+ * /api/v1/manifest changes, so a repeat visit only revalidates the
+ * manifest (a 304 while nothing changed). When admins edit videos the
+ * version moves: cached pages are dropped and the manifest's precache list
+ * is fetched again. Pages not cached yet come from the network and are kept
+ * for next time; offline navigations fall back to the cached home page.
+ *
+ * Bump CACHE_VERSION when templates or static assets change.
+ */
+
+const CACHE_VERSION = 2;
+// "/" or the tenant prefix "/t/<tenant>/"
+const SCOPE = new URL(self.registration.scope).pathname;
+const PAGE_CACHE = `gallery-pages-v${CACHE_VERSION}:${SCOPE}`;
+const ASSET_CACHE = `gallery-assets-v${CACHE_VERSION}:${SCOPE}`;
+const MANIFEST_URL = `${SCOPE}api/v1/manifest`;
+const VERSION_KEY = `${SCOPE}__catalog_version__`;
+const MANIFEST_CHECK_MS = 30 * 1000;
+const PRECACHE_CONCURRENCY = 4;
+
+// Paths below SCOPE served from PAGE_CACHE; /admin and /api always go to the network
+const PAGE_PATHS = [/^$/, /^videos$/, /^videos\/partial$/, /^guide$/, /^video\/[^/]+$/];
+
+let lastCheck = 0;
+let checking = null;
+
+async function fetchManifest() {
+    // Revalidated with the ETag: an unchanged catalog costs a 304
+    const response = await fetch(MANIFEST_URL, { cache: 'no-cache' });
+    if (!response.ok) throw new Error(`Manifest request failed: ${response.status}`);
+    return response.json();
+}
+
+function cacheable(response) {
+    return response.ok && response.type === 'basic' && !response.redirected;
+}
+
+async function precache(manifest) {
+    const pages = await caches.open(PAGE_CACHE);
+    const assets = await caches.open(ASSET_CACHE);
+    const queue = [...manifest.precache];
+
+    // A few requests at a time, not the whole list at once
+    await Promise.all(Array.from({ length: PRECACHE_CONCURRENCY }, async () => {
+        while (queue.length) {
+            const url = SCOPE + queue.shift();
+            try {
+                const response = await fetch(url, { cache: 'no-cache' });
+                if (cacheable(response)) {
+                    await (url.startsWith(`${SCOPE}static/`) ? assets : pages).put(url, response);
+                }
+            } catch (e) {
+                // Offline or busy: the page is cached on its next visit instead
+            }
+        }
+    }));
+    await pages.put(VERSION_KEY, new Response(JSON.stringify(manifest.version)));
+}
+
+async function cachedVersion() {
+    const pages = await caches.open(PAGE_CACHE);
+    const response = await pages.match(VERSION_KEY);
+    return response ? response.json() : null;
+}
+
+function checkManifest() {
+    if (checking || Date.now() - lastCheck < MANIFEST_CHECK_MS) return checking;
+    lastCheck = Date.now();
+    checking = (async () => {
+        try {
+            const manifest = await fetchManifest();
+            if (await cachedVersion() !== manifest.version) {
+                // The catalog changed: any cached page may be out of date
+                await caches.delete(PAGE_CACHE);
+                await precache(manifest);
+            }
+        } catch (e) {
+            // Offline: keep serving what we have
+        } finally {
+            checking = null;
+        }
+    })();
+    return checking;
+}
+
+async function fromPageCache(event) {
+    const request = event.request;
+    const pages = await caches.open(PAGE_CACHE);
+    const cached = await pages.match(request, { ignoreVary: true });
+    if (cached) {
+        event.waitUntil(checkManifest());
+        return cached;
+    }
+
+    try {
+        const response = await fetch(request);
+        if (cacheable(response)) event.waitUntil(pages.put(request, response.clone()));
+        return response;
+    } catch (e) {
+        const home = request.mode === 'navigate' && await pages.match(SCOPE, { ignoreVary: true });
+        return home || Response.error();
+    }
+}
+
+async function fromAssetCache(request) {
+    // Static URLs carry a ?v= for the browser cache; CACHE_VERSION covers them here
+    const assets = await caches.open(ASSET_CACHE);
+    const cached = await assets.match(request, { ignoreSearch: true, ignoreVary: true });
+    if (cached) return cached;
+
+    const response = await fetch(request);
+    if (cacheable(response)) await assets.put(request, response.clone());
+    return response;
+}
+
+self.addEventListener('install', (event) => {
+    event.waitUntil((async () => {
+        try {
+            await precache(await fetchManifest());
+            lastCheck = Date.now();
+        } catch (e) {
+            // Installed with empty caches; they fill as pages are visited
+        }
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        // Caches of older versions for this gallery; other tenants' caches are left alone
+        for (const name of await caches.keys()) {
+            const scope = name.slice(name.indexOf(':') + 1);
+            if (scope === SCOPE && name !== PAGE_CACHE && name !== ASSET_CACHE) {
+                await caches.delete(name);
+            }
+        }
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin || !url.pathname.startsWith(SCOPE)) return;
+
+    const path = url.pathname.slice(SCOPE.length);
+    if (path.startsWith('static/')) {
+        event.respondWith(fromAssetCache(request));
+    } else if (PAGE_PATHS.some((pattern) => pattern.test(path))) {
+        event.respondWith(fromPageCache(event));
+    }
+});
@@ -0,0 +1,23 @@
+"""
+Upload storage backends
+
+The backend is chosen by STORAGE_BACKEND ("local" or "s3") and created
+once per process by get_storage().
+"""
+from functools import lru_cache
+
+from config import get_settings
+from storage.base import StorageBackend
+
+settings = get_settings()
+
+
+@lru_cache()
+def get_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        from storage.s3 import S3Storage
+        return S3Storage()
+    if settings.STORAGE_BACKEND == "local":
+        from storage.local import LocalStorage
+        return LocalStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
@@ -0,0 +1,53 @@
+"""
+Storage backend interface
+"""
+import os
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+from starlette.responses import Response
+
+from db import tenants
+
+
+def tenant_prefix() -> str:
+    """
+    Where the current tenant's files go under the storage root: "" for the
+    default tenant (files stored before tenants existed stay where they
+    are), "tenants/<tenant>/" for the others.
+    """
+    tenant = tenants.current()
+    return "" if tenant == tenants.DEFAULT_TENANT else f"tenants/{tenant}/"
+
+
+class StorageBackend(ABC):
+    """
+    Where uploaded files live and how they are served back. Filenames are
+    per tenant: backends store them under tenant_prefix().
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def save(self, filename: str, fileobj: BinaryIO, content_type: str) -> None:
+        """Store the contents of fileobj (read from its current position) under filename."""
+
+    async def save_file(self, filename: str, path: str, content_type: str) -> None:
+        """
+        Store a file that is already on local disk. Backends may move it
+        instead of copying, so callers must not use `path` afterwards.
+        """
+        with open(path, "rb") as f:
+            await self.save(filename, f, content_type)
+        os.remove(path)
+
+    @abstractmethod
+    async def delete(self, filename: str) -> None:
+        """Remove filename; a missing file is not an error."""
+
+    @abstractmethod
+    async def response(self, filename: str) -> Response:
+        """
+        Response that serves the file: the bytes themselves or a redirect to
+        where they can be fetched. Raises FileNotFoundError if it is missing.
+        """
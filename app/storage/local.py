@@ -0,0 +1,61 @@
+"""
+Local-disk storage - files live in UPLOAD_DIR next to the app
+
+Files of tenants other than the default go in UPLOAD_DIR/tenants/<tenant>/.
+"""
+import asyncio
+import os
+import shutil
+from typing import BinaryIO
+
+from fastapi.responses import FileResponse
+
+from config import get_settings
+from storage.base import StorageBackend, tenant_prefix
+
+settings = get_settings()
+
+UPLOAD_PATH = os.path.join(os.path.dirname(__file__), "..", settings.UPLOAD_DIR)
+COPY_BUFFER = 1024 * 1024
+
+
+class LocalStorage(StorageBackend):
+    name = "local"
+
+    def __init__(self, root: str = UPLOAD_PATH):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, filename: str) -> str:
+        # basename() keeps callers from escaping the upload directory
+        return os.path.join(self.root, tenant_prefix(), os.path.basename(filename))
+
+    def _write(self, filename: str, fileobj: BinaryIO):
+        file_path = self.path(filename)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            shutil.copyfileobj(fileobj, f, COPY_BUFFER)
+
+    def _move(self, path: str, filename: str):
+        file_path = self.path(filename)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        shutil.move(path, file_path)
+
+    async def save(self, filename: str, fileobj: BinaryIO, content_type: str) -> None:
+        await asyncio.to_thread(self._write, filename, fileobj)
+
+    async def save_file(self, filename: str, path: str, content_type: str) -> None:
+        # A rename when on the same filesystem, so large files are not copied
+        await asyncio.to_thread(self._move, path, filename)
+
+    async def delete(self, filename: str) -> None:
+        try:
+            os.remove(self.path(filename))
+        except FileNotFoundError:
+            pass
+
+    async def response(self, filename: str):
+        file_path = self.path(filename)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(filename)
+        return FileResponse(file_path)
@@ -0,0 +1,143 @@
+"""
+S3-compatible storage (AWS S3, MinIO, R2, ...)
+
+Uploads go through boto3's transfer manager, which splits large files
+into parts and uploads them in parallel over a pooled set of connections.
+Downloads never pass through the app: /api/uploads/{filename} redirects
+to a presigned URL (or to S3_PUBLIC_URL when the bucket is public).
+Files of tenants other than the default are keyed S3_PREFIX +
+"tenants/<tenant>/" + filename.
+
+Requires boto3 (`pip install boto3`). Point S3_ENDPOINT_URL at a local
+MinIO (or `moto_server`) to run against a stand-in, and check the
+configured bucket end to end with:
+
+    STORAGE_BACKEND=s3 python -m storage.s3
+"""
+import asyncio
+import io
+import os
+import tempfile
+import urllib.request
+import uuid
+from typing import BinaryIO
+
+from fastapi.responses import RedirectResponse
+
+from config import get_settings
+from storage.base import StorageBackend, tenant_prefix
+
+settings = get_settings()
+
+MB = 1024 * 1024
+
+
+class S3Storage(StorageBackend):
+    name = "s3"
+
+    def __init__(self):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+
+        if not settings.S3_BUCKET:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+
+        self.bucket = settings.S3_BUCKET
+        # boto3 clients are thread-safe; one client shares its connection pool
+        # between the transfer threads of every concurrent upload.
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.S3_ENDPOINT_URL or None,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY or None,
+            config=Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                retries={"max_attempts": 3, "mode": "standard"},
+                signature_version="s3v4",
+            ),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * MB,
+            multipart_chunksize=settings.S3_MULTIPART_CHUNK_MB * MB,
+            max_concurrency=settings.S3_MAX_CONCURRENCY,
+            use_threads=True,
+        )
+
+    def key(self, filename: str) -> str:
+        return f"{settings.S3_PREFIX}{tenant_prefix()}{filename}"
+
+    async def save(self, filename: str, fileobj: BinaryIO, content_type: str) -> None:
+        await asyncio.to_thread(
+            self.client.upload_fileobj,
+            fileobj,
+            self.bucket,
+            self.key(filename),
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer_config,
+        )
+
+    async def save_file(self, filename: str, path: str, content_type: str) -> None:
+        # upload_file reads parts by byte range, so they are uploaded in parallel
+        await asyncio.to_thread(
+            self.client.upload_file,
+            path,
+            self.bucket,
+            self.key(filename),
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer_config,
+        )
+        os.remove(path)
+
+    async def delete(self, filename: str) -> None:
+        await asyncio.to_thread(
+            self.client.delete_object, Bucket=self.bucket, Key=self.key(filename)
+        )
+
+    def url(self, filename: str) -> str:
+        if settings.S3_PUBLIC_URL:
+            return f"{settings.S3_PUBLIC_URL.rstrip('/')}/{self.key(filename)}"
+        # Presigning is a local HMAC computation, no request is made
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.key(filename)},
+            ExpiresIn=settings.S3_PRESIGN_EXPIRES,
+        )
+
+    async def response(self, filename: str):
+        # Missing objects are reported by S3 itself, saving a HEAD round trip
+        return RedirectResponse(url=self.url(filename), status_code=307)
+
+
+async def check():
+    """Round-trip a small and a multipart-sized object through the configured bucket."""
+    storage = S3Storage()
+    small = f"check-{uuid.uuid4().hex}.txt"
+    large = f"check-{uuid.uuid4().hex}.bin"
+    large_data = os.urandom((settings.S3_MULTIPART_THRESHOLD_MB + 1) * MB)
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(large_data)
+    try:
+        await storage.save(small, io.BytesIO(b"safebox"), "text/plain")
+        await storage.save_file(large, f.name, "application/octet-stream")
+        print(f"✓ Uploaded {storage.key(small)} and {storage.key(large)} (multipart)")
+
+        for filename, expected in ((small, b"safebox"), (large, large_data)):
+            with urllib.request.urlopen(storage.url(filename)) as response:
+                if response.read() != expected:
+                    raise RuntimeError(f"{filename}: downloaded bytes differ")
+        print("✓ Downloaded both through their URLs")
+    finally:
+        if os.path.exists(f.name):
+            os.remove(f.name)
+        await storage.delete(small)
+        await storage.delete(large)
+    print(f"✓ S3 storage works ({settings.S3_ENDPOINT_URL or 'AWS'}, bucket {storage.bucket})")
+
+
+if __name__ == "__main__":
+    asyncio.run(check())
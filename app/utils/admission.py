@@ -0,0 +1,233 @@
+"""
+Admission control - per-route-class concurrency limits, rate limits and load shedding
+
+Every HTTP request is sorted into a route class. Each class has its own
+concurrency limit, so slow or CPU-heavy endpoints (bcrypt logins, outbound
+metadata fetches, uploads) can only ever occupy a bounded share of the
+event loop and the cheap public pages keep flowing.
+
+A request that finds its class full waits in line, but only for the class
+queue budget: past that it is shed with 503 + Retry-After instead of piling
+up more latency. Classes with a rate limit also keep a token bucket per
+client address and answer 429 when it runs dry.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+
+from config import get_settings
+
+settings = get_settings()
+
+# Paths that are never queued or shed (health checks must answer under load)
+EXEMPT_PREFIXES = ("/static/", "/api/health")
+
+# Client buckets kept per class; the least recently seen are forgotten first
+MAX_BUCKETS = 10000
+
+# Requests this worker has served and is serving, event streams and exempt
+# paths aside; counted with ADMISSION_CONTROL off too (db/maintenance.py)
+traffic = {"total": 0, "in_flight": 0}
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token. Returns 0 on success, else seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Rejected(Exception):
+    """Request turned away; carries the status code and Retry-After seconds."""
+
+    def __init__(self, status_code: int, retry_after: float, detail: str):
+        self.status_code = status_code
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.detail = detail
+
+
+class RouteClass:
+    """Concurrency limit, queue budget and optional per-client rate limit for a group of routes."""
+
+    def __init__(self, name: str, concurrency: int, queue_budget_ms: float,
+                 rate_per_minute: float = 0, burst: int = 0):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_budget = queue_budget_ms / 1000
+        self.rate = rate_per_minute / 60
+        self.burst = burst or max(5, math.ceil(rate_per_minute / 6))
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._buckets: OrderedDict = OrderedDict()
+
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self.rate_limited = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    def _check_rate(self, client: str):
+        if not self.rate:
+            return
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        wait = bucket.take()
+        if wait:
+            self.rate_limited += 1
+            raise Rejected(429, wait, "Too many requests")
+
+    async def acquire(self, client: str):
+        """Wait for a slot, for at most the queue budget."""
+        self._check_rate(client)
+
+        if self._semaphore.locked():
+            start = time.monotonic()
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_budget)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                raise Rejected(503, settings.ADMISSION_RETRY_AFTER, "Server is busy, please retry")
+            finally:
+                self.queued -= 1
+            waited = time.monotonic() - start
+            self.queue_time_total += waited
+            self.queue_time_max = max(self.queue_time_max, waited)
+        else:
+            await self._semaphore.acquire()
+        self.admitted += 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_budget_ms": self.queue_budget * 1000,
+            "rate_per_minute": self.rate * 60,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "rate_limited": self.rate_limited,
+            "avg_queue_ms": round(self.queue_time_total / self.admitted * 1000, 2) if self.admitted else 0.0,
+            "max_queue_ms": round(self.queue_time_max * 1000, 2),
+        }
+
+
+def build_classes() -> dict:
+    budget = settings.ADMISSION_QUEUE_BUDGET_MS
+    return {
+        "login": RouteClass("login", settings.LOGIN_CONCURRENCY, budget,
+                            settings.LOGIN_RATE_PER_MINUTE),
+        "metadata": RouteClass("metadata", settings.METADATA_CONCURRENCY, budget,
+                               settings.METADATA_RATE_PER_MINUTE),
+        "upload": RouteClass("upload", settings.UPLOAD_CONCURRENCY, settings.UPLOAD_QUEUE_BUDGET_MS),
+        # Event streams stay open; when all slots are taken, refuse at once
+        "events": RouteClass("events", settings.SSE_MAX_CONNECTIONS, 0),
+        "default": RouteClass("default", settings.DEFAULT_CONCURRENCY, budget),
+    }
+
+
+# Populated when the middleware is built, inside the serving event loop
+route_classes: dict = {}
+
+
+def classify(method: str, path: str) -> str:
+    if path == "/api/auth/login" and method == "POST":
+        return "login"
+    if path == "/api/admin/events":
+        return "events"
+    if path.startswith("/utils/metadata"):
+        return "metadata"
+    # Covers the simple upload and the resumable /api/admin/uploads/* endpoints
+    if path.startswith("/api/admin/upload") and method != "HEAD":
+        return "upload"
+    return "default"
+
+
+def stats() -> dict:
+    return {name: route_class.stats() for name, route_class in route_classes.items()}
+
+
+class AdmissionMiddleware:
+    """ASGI middleware; the slot is held until the response body has been sent."""
+
+    def __init__(self, app):
+        self.app = app
+        route_classes.clear()
+        route_classes.update(build_classes())
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            # /t/<tenant> prefix of path-mode tenancy (see utils/tenancy.py)
+            path = path[len(root_path):]
+        if scope["type"] != "http" or path.startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        name = classify(scope["method"], path)
+        counted = name != "events"
+        if counted:
+            traffic["total"] += 1
+            traffic["in_flight"] += 1
+        try:
+            if settings.ADMISSION_CONTROL:
+                await self._admit(route_classes[name], scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            if counted:
+                traffic["in_flight"] -= 1
+
+    async def _admit(self, route_class: "RouteClass", scope, receive, send):
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        try:
+            await route_class.acquire(client)
+        except Rejected as exc:
+            await self._reject(send, exc)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route_class.release()
+
+    @staticmethod
+    async def _reject(send, exc: Rejected):
+        body = json.dumps({"detail": exc.detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": exc.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(exc.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,155 @@
+"""
+In-process caches kept coherent across worker processes
+
+Every worker polls the catalog_version and admins_version counters, which
+triggers bump on every write to the videos and admins tables (see
+db/database.py), whichever process made it. An admin edit handled by one
+worker therefore empties the caches of every worker within
+CACHE_COHERENCE_INTERVAL seconds, while commits to other tables (jobs,
+notifications, upload sessions, maintenance) leave them alone. The worker
+that made the edit also calls invalidate_all() right after committing.
+
+A load that started before an invalidation is not cached when it
+finishes: clear() moves the tenant to a new generation and set() skips
+values read under an older one.
+
+Entries are keyed by tenant (db/tenants.py): a write empties only the
+caches of the tenant it was made in. Only recently active tenants are
+watched, on a pooled connection; the caches of a tenant that goes quiet
+are emptied rather than kept in sync.
+"""
+import asyncio
+import sqlite3
+from collections import OrderedDict
+
+from config import get_settings
+from db import tenants
+from db.database import connect
+
+settings = get_settings()
+
+_registry: list = []
+
+
+class VersionedCache:
+    """Small LRU cache, per tenant, that is emptied whenever the tenant's catalog or admins change."""
+
+    def __init__(self, name: str, maxsize: int = 256):
+        self.name = name
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._generations: dict = {}  # tenant -> number of clear() calls
+        self._epoch = 0  # clear() calls for every tenant
+        self.hits = 0
+        self.misses = 0
+        _registry.append(self)
+
+    def get(self, key, default=None):
+        key = (tenants.current(), key)
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def generation(self) -> tuple:
+        """Token for the current tenant's contents; pass it to set() after a slow load."""
+        return self._epoch, self._generations.get(tenants.current(), 0)
+
+    def set(self, key, value, generation: tuple = None):
+        if generation is not None and generation != self.generation():
+            return  # cleared while the value was being loaded
+        key = (tenants.current(), key)
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self, tenant: str = None):
+        """Drop the entries of `tenant`, or of every tenant."""
+        if tenant is None:
+            self._epoch += 1
+            self._data.clear()
+            return
+        self._generations[tenant] = self._generations.get(tenant, 0) + 1
+        for key in [key for key in self._data if key[0] == tenant]:
+            del self._data[key]
+
+    async def get_or_load(self, key, loader, keep=None):
+        """Return the cached value for key, awaiting loader() on a miss. Values keep() rejects aren't cached."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self.generation()
+            value = await loader()
+            if keep is None or keep(value):
+                self.set(key, value, generation)
+        return value
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+_MISSING = object()
+
+# Catalog queries (counts, JSON API, admin stats)
+catalog_cache = VersionedCache("catalog", maxsize=512)
+# Public listing and video pages, keyed by URL parameters: kept apart so
+# requests for arbitrary ids and offsets can't push out the entries above
+page_cache = VersionedCache("pages", maxsize=256)
+# Admin rows looked up on every authenticated request, keyed by email
+admin_cache = VersionedCache("admins", maxsize=64)
+
+
+def invalidate_all(tenant: str = None):
+    """Empty every cache for `tenant` (default: the current tenant)."""
+    tenant = tenant or tenants.current()
+    for cache in _registry:
+        cache.clear(tenant)
+
+
+tenants.on_evict(invalidate_all)
+
+
+def stats() -> dict:
+    return {cache.name: cache.stats() for cache in _registry}
+
+
+VERSION_QUERY = "SELECT (SELECT version FROM catalog_version), (SELECT version FROM admins_version)"
+
+
+async def watch_versions():
+    """
+    Background task: clear a tenant's caches when its videos or admins change.
+
+    Only tenants with recent requests are checked, on a connection from
+    their pool. A tenant that goes quiet has its caches emptied instead, so
+    nothing stale is served when its next request arrives.
+    """
+    # Tenant -> last versions seen
+    watched: dict = {}
+    while True:
+        active = tenants.active_tenants()
+        for tenant in set(watched) - set(active):
+            del watched[tenant]
+            invalidate_all(tenant)
+
+        for tenant in active:
+            try:
+                with tenants.use(tenant):
+                    async with connect() as db:
+                        cursor = await db.execute(VERSION_QUERY)
+                        version = tuple(await cursor.fetchone())
+            except sqlite3.Error as e:
+                # Changes may be missed until the database answers again: start over
+                print(f"⚠️  Cache watcher ({tenant}): {e}")
+                invalidate_all(tenant)
+                watched.pop(tenant, None)
+                continue
+            # A new baseline also clears what was cached before it was taken
+            if version != watched.get(tenant):
+                invalidate_all(tenant)
+            watched[tenant] = version
+        await asyncio.sleep(settings.CACHE_COHERENCE_INTERVAL)
@@ -0,0 +1,191 @@
+"""
+MP4 box parsing: faststart rewriting and basic probing (pure Python)
+
+Many encoders write the `moov` box (the index of every sample) after the
+media data in `mdat`, so a browser has to fetch the end of the file before
+it can start playing. faststart() moves `moov` in front of the media data
+and shifts the chunk offsets in every stco/co64 table to match.
+"""
+import os
+import shutil
+import struct
+import tempfile
+
+# Boxes that only contain other boxes, on the path to the tables we need
+CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"dinf"}
+COPY_BUFFER = 1024 * 1024
+UINT32_MAX = 0xFFFFFFFF
+
+
+class MP4Error(ValueError):
+    """Raised when a file is not a well-formed MP4."""
+
+
+def iter_boxes(data, start: int = 0, end: int = None):
+    """Yield (type, offset, size, header_size) for boxes in a bytes-like object."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                raise MP4Error("Truncated 64-bit box header")
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise MP4Error(f"Invalid size for box {box_type!r} at {pos}")
+        yield box_type, pos, size, header
+        pos += size
+
+
+def iter_file_boxes(f):
+    """Yield (type, offset, size, header_size) for the top-level boxes of a file."""
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, box_type = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size or pos + size > file_size:
+            raise MP4Error(f"Invalid size for box {box_type!r} at {pos}")
+        yield box_type, pos, size, header_size
+        pos += size
+
+
+def _walk(data, start: int, end: int):
+    """Yield (type, payload_start, payload_end) for every box under `start..end`."""
+    for box_type, offset, size, header in iter_boxes(data, start, end):
+        yield box_type, offset + header, offset + size
+        if box_type in CONTAINERS:
+            yield from _walk(data, offset + header, offset + size)
+
+
+def _read_moov(f):
+    boxes = list(iter_file_boxes(f))
+    moov = next((b for b in boxes if b[0] == b"moov"), None)
+    if moov is None:
+        raise MP4Error("No moov box")
+    f.seek(moov[1])
+    return boxes, moov, bytearray(f.read(moov[2]))
+
+
+def _shift_chunk_offsets(moov: bytearray, header: int, shift: int, below: int):
+    """Add `shift` to every chunk offset that points before `below`."""
+    for box_type, start, end in _walk(moov, header, len(moov)):
+        if box_type == b"cmov":
+            raise MP4Error("Compressed moov boxes are not supported")
+        if box_type not in (b"stco", b"co64"):
+            continue
+        count = struct.unpack_from(">I", moov, start + 4)[0]
+        width, fmt = (4, ">I") if box_type == b"stco" else (8, ">Q")
+        pos = start + 8
+        for _ in range(count):
+            offset = struct.unpack_from(fmt, moov, pos)[0]
+            if offset < below:
+                offset += shift
+                if width == 4 and offset > UINT32_MAX:
+                    raise MP4Error("Chunk offset no longer fits in stco")
+                struct.pack_into(fmt, moov, pos, offset)
+            pos += width
+
+
+def _copy_range(src, dst, offset: int, size: int):
+    src.seek(offset)
+    while size > 0:
+        chunk = src.read(min(COPY_BUFFER, size))
+        if not chunk:
+            raise MP4Error("Unexpected end of file")
+        dst.write(chunk)
+        size -= len(chunk)
+
+
+def is_faststart(path: str) -> bool:
+    """True if moov already comes before the first mdat."""
+    with open(path, "rb") as f:
+        for box_type, *_ in iter_file_boxes(f):
+            if box_type == b"moov":
+                return True
+            if box_type == b"mdat":
+                return False
+    return False
+
+
+def faststart(path: str) -> bool:
+    """
+    Rewrite `path` in place so that moov precedes mdat.
+    Returns True if the file was rewritten, False if it already was faststart.
+    Raises MP4Error for files that can't be handled; the original is left untouched.
+    """
+    with open(path, "rb") as src:
+        boxes, moov_box, moov = _read_moov(src)
+        first_mdat = next((b for b in boxes if b[0] == b"mdat"), None)
+        if first_mdat is None or moov_box[1] < first_mdat[1]:
+            return False
+
+        # Everything between the first mdat and the old moov position moves
+        # down by the size of moov; data after it stays where it was.
+        _shift_chunk_offsets(moov, moov_box[3], shift=len(moov), below=moov_box[1])
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".mp4")
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                for box in boxes:
+                    if box is moov_box:
+                        continue
+                    if box is first_mdat:
+                        dst.write(moov)
+                    _copy_range(src, dst, box[1], box[2])
+            shutil.copystat(path, tmp_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    os.replace(tmp_path, path)
+    return True
+
+
+def probe(path: str) -> dict:
+    """Duration (seconds) and the dimensions of the first video track."""
+    with open(path, "rb") as f:
+        _, moov_box, moov = _read_moov(f)
+
+    info = {"duration": None, "width": None, "height": None}
+    for box_type, offset, size, header in iter_boxes(moov, moov_box[3], len(moov)):
+        payload = offset + header
+        if box_type == b"mvhd":
+            if payload >= offset + size:
+                raise MP4Error("Truncated mvhd box")
+            version = moov[payload]
+            if payload + (32 if version == 1 else 20) > offset + size:
+                raise MP4Error("Truncated mvhd box")
+            if version == 1:
+                timescale, duration = struct.unpack_from(">IQ", moov, payload + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", moov, payload + 12)
+            if timescale:
+                info["duration"] = round(duration / timescale, 3)
+        elif box_type == b"trak" and info["width"] is None:
+            tkhd = handler = None
+            for child, start, end in _walk(moov, payload, offset + size):
+                if child == b"tkhd":
+                    tkhd = (start, end)
+                elif child == b"hdlr":
+                    handler = bytes(moov[start + 8:start + 12])
+            if handler == b"vide" and tkhd:
+                if tkhd[1] - tkhd[0] < 8:
+                    raise MP4Error("Truncated tkhd box")
+                # Width and height are the last two 16.16 fixed-point fields
+                width, height = struct.unpack_from(">II", moov, tkhd[1] - 8)
+                info["width"], info["height"] = width >> 16, height >> 16
+    info["faststart"] = is_faststart(path)
+    return info
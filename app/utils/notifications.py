@@ -0,0 +1,224 @@
+"""
+Admin notifications - persisted events fanned out to Server-Sent Events subscribers
+
+publish() stores an event in the `notifications` table. Every worker
+process runs tail_notifications(), which reads rows newer than the last
+one it broadcast and hands them to the in-process Hub, so events reach
+subscribers on every worker, in id order. The row id doubles as the SSE
+event id, which lets a reconnecting client resume with Last-Event-ID.
+
+Each subscriber has a bounded queue. A subscriber that falls behind is
+dropped rather than buffering without limit; its stream ends and the
+browser reconnects, replaying what it missed from the table.
+
+Every tenant has its own table and therefore its own Hub (get_hub()). The
+tailer visits the recently active tenants, and only queries those with a
+subscriber connected (an open stream keeps its tenant active); the others
+are just pruned once an hour.
+"""
+import asyncio
+import json
+import sqlite3
+import time
+from typing import Optional
+
+import aiosqlite
+
+from config import get_settings
+from db import tenants
+from db.database import connect
+
+settings = get_settings()
+
+# Set by publish() so the tailer in this process picks up new rows immediately
+_wakeup: Optional[asyncio.Event] = None
+
+
+class Subscriber:
+    def __init__(self, maxsize: int, since: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = False
+        self.since = since  # the newest event id when it subscribed
+
+
+class Hub:
+    """In-process broadcast to SSE subscribers."""
+
+    def __init__(self):
+        self.subscribers: set = set()
+        # Newest row broadcast; None while nobody is subscribed
+        self.last_id: Optional[int] = None
+        self.published = 0
+        self.dropped = 0
+        self.last_prune = 0.0
+
+    def subscribe(self, since: int) -> Subscriber:
+        subscriber = Subscriber(settings.SSE_QUEUE_SIZE, since)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def broadcast(self, event: dict):
+        self.last_id = max(self.last_id or 0, event["id"])
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: cut it loose; it resumes from Last-Event-ID
+                subscriber.dropped = True
+                self.subscribers.discard(subscriber)
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "last_id": self.last_id,
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+_hubs: dict = {}  # tenant -> Hub
+
+
+def get_hub() -> Hub:
+    """The Hub of the current tenant."""
+    tenant = tenants.current()
+    hub = _hubs.get(tenant)
+    if hub is None:
+        hub = _hubs[tenant] = Hub()
+    return hub
+
+
+@tenants.on_evict
+def _drop_hub(tenant: str):
+    _hubs.pop(tenant, None)
+
+
+def _row_to_event(row) -> dict:
+    return {
+        "id": row["id"],
+        "type": row["type"],
+        "message": row["message"],
+        "link": row["link"],
+        "data": json.loads(row["data"]) if row["data"] else None,
+        "created_at": row["created_at"],
+    }
+
+
+async def publish(type: str, message: str, link: str = None, data: dict = None) -> Optional[int]:
+    """
+    Persist an event; subscribers on every worker receive it. Returns its id.
+    Best effort: a failure is logged, never raised into the caller's request.
+    """
+    try:
+        async with connect() as db:
+            cursor = await db.execute(
+                "INSERT INTO notifications (type, message, link, data) VALUES (?, ?, ?, ?)",
+                (type, message, link, json.dumps(data) if data is not None else None)
+            )
+            event_id = cursor.lastrowid
+            await db.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not record notification {type}: {e}")
+        return None
+    if _wakeup is not None:
+        _wakeup.set()
+    return event_id
+
+
+async def fetch_since(last_id: int, limit: int) -> list:
+    """Events after `last_id`, oldest first."""
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT * FROM notifications WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)
+        )
+        return [_row_to_event(row) for row in await cursor.fetchall()]
+
+
+async def latest_id() -> int:
+    """Id of the newest event, 0 if there are none."""
+    async with connect() as db:
+        cursor = await db.execute("SELECT COALESCE(MAX(id), 0) FROM notifications")
+        return (await cursor.fetchone())[0]
+
+
+async def recent(limit: int) -> list:
+    """The latest events, newest first."""
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM notifications ORDER BY id DESC LIMIT ?", (limit,))
+        return [_row_to_event(row) for row in await cursor.fetchall()]
+
+
+async def _prune(db):
+    await db.execute(
+        "DELETE FROM notifications WHERE created_at < datetime('now', ?)",
+        (f"-{settings.NOTIFICATION_RETENTION_DAYS} days",)
+    )
+    await db.commit()
+
+
+async def _tail(db, hub: Hub) -> bool:
+    """Broadcast new rows of one tenant. True if there may be more waiting."""
+    if not hub.subscribers:
+        # Nobody listening: the next subscriber starts from a fresh baseline
+        hub.last_id = None
+    else:
+        if hub.last_id is None:
+            # Only events newer than the subscriptions are broadcast; older ones are served by replay
+            hub.last_id = min(subscriber.since for subscriber in hub.subscribers)
+        cursor = await db.execute(
+            "SELECT * FROM notifications WHERE id > ? ORDER BY id LIMIT 500",
+            (hub.last_id,)
+        )
+        rows = await cursor.fetchall()
+        for row in rows:
+            hub.broadcast(_row_to_event(row))
+        if len(rows) == 500:
+            return True
+
+    if time.monotonic() - hub.last_prune > 3600:
+        await _prune(db)
+        hub.last_prune = time.monotonic()
+    return False
+
+
+async def tail_notifications():
+    """Background task: broadcast rows committed by any process, in id order."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    while True:
+        _wakeup.clear()
+        more = False
+        for tenant in tenants.active_tenants():
+            with tenants.use(tenant):
+                hub = get_hub()
+                if not hub.subscribers and time.monotonic() - hub.last_prune < 3600:
+                    hub.last_id = None
+                    continue
+                try:
+                    async with connect() as db:
+                        db.row_factory = aiosqlite.Row
+                        more |= await _tail(db, hub)
+                except sqlite3.OperationalError as e:
+                    # Database busy; the next poll catches up
+                    print(f"⚠️  Notification tailer ({tenant}): {e}")
+        if more:
+            continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.NOTIFICATION_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def format_event(event: dict) -> str:
+    """One SSE message; the row id is the event id clients resume from."""
+    payload = json.dumps({k: v for k, v in event.items() if k != "id"})
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
@@ -0,0 +1,54 @@
+"""
+Opaque keyset-pagination cursors
+"""
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*values) -> str:
+    """Encode the sort key of the last row on a page."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int = 2) -> list:
+    """Decode a cursor made by encode_cursor(); 400 if it was tampered with."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+class PagedRows:
+    """
+    Async-iterates at most `limit` rows from `rows` (which should hold up to
+    limit + 1). Once iteration is over, `next_cursor` points after the last
+    row yielded if there was more, so a streamed template can render the
+    "load more" link after its loop.
+    """
+
+    def __init__(self, rows, limit: int, key: str):
+        self.rows = rows
+        self.limit = limit
+        self.key = key
+        self.next_cursor = None
+
+    async def __aiter__(self):
+        count, last = 0, None
+        async for row in self.rows:
+            if count == self.limit:
+                self.next_cursor = encode_cursor(last[self.key], last["id"])
+                break
+            count += 1
+            last = row
+            yield row
+        await self.aclose()
+
+    async def aclose(self):
+        await self.rows.aclose()
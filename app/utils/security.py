@@ -6,6 +6,7 @@ from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from config import get_settings
+from db import tenants
 
 settings = get_settings()
 
@@ -26,8 +27,9 @@ def get_password_hash(password: str) -> str:
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Create a JWT access token."""
+    """Create a JWT access token, valid for the current tenant only."""
     to_encode = data.copy()
+    to_encode["tenant"] = tenants.current()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -38,9 +40,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 def decode_token(token: str) -> Optional[dict]:
-    """Decode and verify a JWT token."""
+    """Decode and verify a JWT token; tokens issued by another tenant are rejected."""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    # Admin emails repeat across tenants; the token must come from this one
+    if payload.get("tenant", tenants.DEFAULT_TENANT) != tenants.current():
+        return None
+    return payload
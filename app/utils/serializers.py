@@ -0,0 +1,15 @@
+"""
+Fast JSON serialization for API responses
+"""
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+import json
+
+
+def dumps(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
@@ -0,0 +1,115 @@
+"""
+Streaming template rendering
+
+TemplateResponse renders the whole page into one string before the first
+byte goes out. StreamingTemplates renders with Jinja's async mode instead
+and sends the output as it is produced, so the <head> (stylesheets,
+scripts) reaches the browser while the rows are still being read. Loops
+in the template can iterate over iter_rows(), which reads straight from a
+database cursor, so a long listing is never held in memory as a whole.
+
+GZipMiddleware would hold a stream back until its compressor fills up, so
+streamed pages are compressed here with a sync flush after every chunk,
+and EventStreamGZipMiddleware passes Server-Sent Events through unchanged.
+"""
+import zlib
+from typing import AsyncIterator
+
+import aiosqlite
+import jinja2
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+
+from db.database import connect
+
+# Rendered output is sent in chunks of roughly this size
+FLUSH_SIZE = 8 * 1024
+GZIP_LEVEL = 6
+
+
+async def iter_rows(sql: str, parameters=()) -> AsyncIterator[dict]:
+    """Rows as dicts, fetched from the cursor in chunks while they are consumed."""
+    async with connect() as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(sql, parameters) as cursor:
+            async for row in cursor:
+                yield dict(row)
+
+
+class StreamingTemplates(Jinja2Templates):
+    """Jinja2Templates on an async environment, adding stream() next to TemplateResponse()."""
+
+    def __init__(self, directory: str, context_processors: list = None):
+        env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(directory),
+            autoescape=True,
+            enable_async=True,
+        )
+        super().__init__(env=env, context_processors=context_processors)
+
+    def stream(self, request: Request, name: str, context: dict,
+               status_code: int = 200, headers: dict = None) -> StreamingResponse:
+        context = {"request": request, **context}
+        for processor in self.context_processors:
+            context.update(processor(request))
+        chunks = self._render(self.get_template(name), context)
+        headers = dict(headers or {})
+
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            chunks = self._gzip(chunks)
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+
+        return StreamingResponse(chunks, status_code=status_code, headers=headers, media_type="text/html")
+
+    @staticmethod
+    async def _render(template, context: dict) -> AsyncIterator[str]:
+        buffer, size = [], 0
+        try:
+            async for piece in template.generate_async(context):
+                buffer.append(piece)
+                size += len(piece)
+                if size >= FLUSH_SIZE:
+                    yield "".join(buffer)
+                    buffer, size = [], 0
+            if buffer:
+                yield "".join(buffer)
+        finally:
+            # Close row generators the template didn't exhaust (client went
+            # away, or an error), releasing their database connections now
+            for value in context.values():
+                if hasattr(value, "aclose"):
+                    await value.aclose()
+
+    @staticmethod
+    async def _gzip(chunks) -> AsyncIterator[bytes]:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        async for chunk in chunks:
+            yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+class EventStreamGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves text/event-stream responses uncompressed."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("Accept-Encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        responder.send = send
+        target = send
+
+        async def send_maybe_gzip(message):
+            nonlocal target
+            if message["type"] == "http.response.start":
+                content_type = Headers(raw=message["headers"]).get("content-type", "")
+                if not content_type.startswith("text/event-stream"):
+                    target = responder.send_with_gzip
+            await target(message)
+
+        await self.app(scope, receive, send_maybe_gzip)
@@ -0,0 +1,111 @@
+"""
+Tenant resolution - which gallery a request belongs to
+
+TENANT_MODE = "host": the tenant is looked up in TENANT_HOSTS, or is the
+first label of a host under TENANT_DOMAIN (acme.gallery.example -> acme).
+Any other host is served by the default tenant.
+
+TENANT_MODE = "path": /t/<tenant>/... is served by <tenant> with /t/<tenant>
+as the ASGI root_path, so routes see their usual paths, url_for() stays
+inside the tenant and templates prefix their links with {{ root_path }}.
+Paths without the prefix belong to the default tenant.
+
+Tenants without a database (see db/tenants.py) get a 404.
+"""
+import json
+import re
+
+from starlette.datastructures import Headers
+
+from config import get_settings
+from db import tenants
+from db.database import init_db
+
+settings = get_settings()
+
+PATH_PREFIX = re.compile(r"^/t/([^/]+)")
+
+
+def resolve(scope) -> tuple:
+    """(tenant, path prefix) for a request; tenant is None when it can't be served."""
+    if settings.TENANT_MODE == "path":
+        match = PATH_PREFIX.match(scope["path"][len(scope.get("root_path", "")):])
+        if match is None:
+            return tenants.DEFAULT_TENANT, ""
+        if match.group(1) == tenants.DEFAULT_TENANT:
+            return None, ""  # only served without a prefix
+        return match.group(1), match.group(0)
+
+    host = Headers(scope=scope).get("host", "").split(":")[0].lower()
+    if host in settings.TENANT_HOSTS:
+        return settings.TENANT_HOSTS[host], ""
+    domain = settings.TENANT_DOMAIN.lower()
+    if domain and host.endswith("." + domain):
+        label = host[:-len(domain) - 1]
+        return (None if "." in label else label), ""
+    return tenants.DEFAULT_TENANT, ""
+
+
+def template_context(request) -> dict:
+    """Context processor: prefix for root-relative links in templates."""
+    return {"root_path": request.scope.get("root_path", "")}
+
+
+class TenantMiddleware:
+    """ASGI middleware; makes the request's tenant current while it is served."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TENANT_MODE:
+            await self.app(scope, receive, send)
+            return
+
+        tenant, prefix = resolve(scope)
+        if tenant is None or not tenants.exists(tenant):
+            await self._respond(send, 404, {"detail": "Gallery not found"})
+            return
+
+        if prefix:
+            root_path = scope.get("root_path", "") + prefix
+            if scope["path"] == root_path:
+                await self._respond(send, 307, None, [(b"location", (root_path + "/").encode())])
+                return
+            scope = dict(scope, root_path=root_path)
+            send = self._prefix_redirects(send, root_path.encode())
+
+        tenant_pool = await tenants.checkout(tenant, init_db)
+        try:
+            with tenants.use(tenant):
+                await self.app(scope, receive, send)
+        finally:
+            tenants.checkin(tenant_pool)
+
+    @staticmethod
+    def _prefix_redirects(send, root_path: bytes):
+        """Keep root-relative redirects (Location: /admin/...) inside the tenant."""
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    (name, root_path + value)
+                    if name.lower() == b"location" and value.startswith(b"/") and not value.startswith(b"//")
+                    else (name, value)
+                    for name, value in message.get("headers", [])
+                ]
+            await send(message)
+        return wrapped
+
+    @staticmethod
+    async def _respond(send, status: int, detail, headers: list = ()):
+        body = json.dumps(detail).encode() if detail is not None else b""
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})